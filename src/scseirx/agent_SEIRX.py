@@ -1,5 +1,75 @@
 from mesa import Agent
 
+# agent attributes that determine the agent states counted by the data 
+# collector, see counted_state
+COUNTED_STATE_ATTRIBUTES = ['exposed', 'infectious', 'recovered', 
+    'symptomatic_course', 'quarantined', 'vaccinated']
+
+def get_counted_states(agent):
+    '''
+    Returns the agent states ('S', 'E', 'I', 'I_symptomatic', 'R', 'X' and 'V')
+    that an agent is currently counted towards by the data collector. Note: 
+    agents in state 'I_asymptomatic' are not counted separately, since their 
+    number is the difference between the counts of states 'I' and 
+    'I_symptomatic'.
+    '''
+    states = []
+    if agent.exposed:
+        states.append('E')
+    if agent.infectious:
+        states.append('I')
+        if agent.symptomatic_course:
+            states.append('I_symptomatic')
+    if agent.recovered:
+        states.append('R')
+    if not (agent.exposed or agent.infectious or agent.recovered):
+        states.append('S')
+    if agent.quarantined:
+        states.append('X')
+    if agent.vaccinated:
+        states.append('V')
+    return states
+
+
+class counted_state:
+    '''
+    Agent attribute that determines which agent states an agent is counted
+    towards (see get_counted_states()). Once the model has registered the agent
+    in its state counters, every change of the attribute updates the counters
+    of agents per agent state and agent type, such that the population counts
+    do not have to be determined by iterating over all agents every step. 
+    Changes are also written to the agent's entry in the model's array of 
+    agent states, which allows vectorized queries over all agents.
+    The value is stored in the instance dictionary under the attribute's name.
+    Since the descriptor only defines __set__, it is still a data descriptor:
+    reading the attribute looks up the descriptor on the class first and then
+    returns the value from the instance dictionary without calling into 
+    Python code. If the attribute has never been set, the read returns the
+    descriptor itself, therefore agents set all counted states at the start 
+    of agent_SEIRX.__init__() and the model checks this when it registers 
+    the agents (see SEIRX._register_state_counts()).
+    '''
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __set__(self, agent, value):
+        agent_dict = agent.__dict__
+        if not agent_dict.get('_counted', False) or \
+           agent_dict[self.name] == value:
+            agent_dict[self.name] = value
+            return
+
+        model = agent.model
+        counts = model.state_counts
+        agent_type_code = agent_dict['type_code']
+        for state in get_counted_states(agent):
+            counts[state][agent_type_code] -= 1
+        agent_dict[self.name] = value
+        for state in get_counted_states(agent):
+            counts[state][agent_type_code] += 1
+        model.agent_states[self.name][agent_dict['_index']] = value
+
 
 class agent_SEIRX(Agent):
     '''
@@ -9,10 +79,59 @@ class agent_SEIRX(Agent):
     generic agent class needs to implement their own step() function
     '''
 
+    # Note: one counted_state for every attribute in COUNTED_STATE_ATTRIBUTES
+    exposed = counted_state()
+    infectious = counted_state()
+    recovered = counted_state()
+    symptomatic_course = counted_state()
+    quarantined = counted_state()
+    vaccinated = counted_state()
+
+    # Note: the mesa Agent base class does not define __slots__, such that
+    # agents keep their instance dictionary (which also holds the counted state
+    # attributes). Slots are used for the counters and flags that are read and
+    # written by every agent in every step, which speeds up attribute access.
+    __slots__ = ('days_since_exposure', 'days_quarantined',
+        'days_since_tested', 'tested', 'pending_test', 'known_positive',
+        'contact_to_infected', 'symptoms', 'sample')
+
+    def __setstate__(self, state):
+        '''
+        Restores a pickled agent. Agents that were pickled before the counters
+        and flags became slots store them in their instance dictionary, where
+        they would be hidden by the slots: move them to the slots instead.
+        '''
+        if isinstance(state, tuple):
+            state, slot_state = state
+        else:
+            slot_state = None
+        state = dict(state or {})
+        slot_state = dict(slot_state or {})
+        for name in agent_SEIRX.__slots__:
+            if name in state:
+                slot_state[name] = state.pop(name)
+
+        # the counted states are written to the instance dictionary directly,
+        # such that unpickling does not update the model's state counters
+        self.__dict__.update(state)
+        for name, value in slot_state.items():
+            setattr(self, name, value)
+
     def __init__(self, unique_id, unit, model,
         exposure_duration, time_until_symptoms, infection_duration, vaccinated,
         voluntary_testing, verbosity):
         super().__init__(unique_id, model)
+
+        # counted states (see counted_state) are set before anything else, 
+        # such that they are never read before they are set. Vaccinated true or
+        # false (depending on chosen probability)
+        self.vaccinated = vaccinated
+        self.exposed = False
+        self.infectious = False
+        self.recovered = False
+        self.symptomatic_course = False
+        self.quarantined = False
+
         self.verbose = verbosity
         self.ID = unique_id
         self.unit = unit
@@ -28,10 +147,12 @@ class agent_SEIRX(Agent):
         self.time_until_symptoms = time_until_symptoms
         # number of days agents stay infectuous
         self.infection_duration = infection_duration
-        # vaccinated true or false (depending on chosen probability)
-        self.vaccinated = vaccinated
 
 
+        # integer code of the agent's type, used to index arrays and counters
+        # that hold information for all agent types (see SEIRX.agent_type_codes)
+        self.type_code = self.model.agent_type_codes[self.type]
+
         ## agent-group wide parameters that are stored in the model class
         self.index_probability = self.model.index_probabilities[self.type]
         self.mask = self.model.masks[self.type]
@@ -55,21 +176,15 @@ class agent_SEIRX(Agent):
 
 
         ## infection states
-        self.exposed = False
-        self.infectious = False
-        self.symptomatic_course = False
-
         if not self.vaccinated and \
             self.model.random.random() <= self.symptom_probability:
             self.symptomatic_course = True
 
 
         self.symptoms = False
-        self.recovered = False
         self.tested = False
         self.pending_test = False
         self.known_positive = False
-        self.quarantined = False
 
         # sample given for test
         self.sample = None
@@ -86,11 +201,32 @@ class agent_SEIRX(Agent):
 
 
 
+    @property
+    def infection_state(self):
+        '''
+        Infection state of the agent ('exposed', 'infectious', 'recovered' or
+        'susceptible') as recorded by the data collector.
+        '''
+        if self.exposed: return 'exposed'
+        elif self.infectious: return 'infectious'
+        elif self.recovered: return 'recovered'
+        else: return 'susceptible'
+
+
     ### generic helper functions that are inherited by other agent classes
 
     def get_contacts(self, agent_group):
-        contacts = [a for a in self.model.schedule.agents if
-            (a.type == agent_group and self.model.G.has_edge(self.ID, a.ID))]
+        # look up the neighbours of the agent in the contact network instead 
+        # of checking every agent of the group for an edge. Note: agents 
+        # without contacts on a given weekday are not part of that weekday's
+        # network. Contacts are returned in scheduling order, as listed in the
+        # model's agents_by_type.
+        agents_by_ID = self.model.agents_by_ID
+        contacts = [agents_by_ID.get(ID) for ID in \
+            self.model.G.adj.get(self.ID, {})]
+        contacts = [a for a in contacts if a is not None and \
+            a.type == agent_group]
+        contacts.sort(key=lambda a: a._index)
         return contacts
 
 
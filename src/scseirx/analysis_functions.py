@@ -7,10 +7,14 @@ import pickle
 import bz2
 import _pickle as cPickle
 from os.path import join
+import random
 from random import shuffle
 import time
+from multiprocessing import Pool
+from functools import partial
 
 from scseirx import construct_school_network as csn
+from scseirx.model_SEIRX import count_agents
 
 def get_agent(model, ID):
     for a in model.schedule.agents:
@@ -24,8 +28,17 @@ def test_infection(a):
         return 0
     
 def count_infected(model, agent_type):
-    infected_agents = np.asarray([test_infection(a) for a in model.schedule.agents \
-                         if a.type == agent_type]).sum()
+    # models that were pickled before the models kept state counters do not
+    # have them: iterate over all agents of the given type instead
+    if not hasattr(model, 'state_counts'):
+        infected_agents = np.asarray([test_infection(a) for a in \
+            model.schedule.agents if a.type == agent_type]).sum()
+        return infected_agents
+
+    # exposed, infectious and recovered agents are disjoint groups, such that 
+    # their counts can be read from the model's state counters and added up
+    infected_agents = sum(count_agents(model, agent_type, state) for state \
+        in ['E', 'I', 'R'])
     
     return infected_agents
 
@@ -38,7 +51,7 @@ def count_infection_endpoints(model):
 def count_typed_transmissions(model, source_type, target_type):
     type_dict = {'t':'teacher', 's':'student', 'f':'family_member', \
         'r':'resident', 'e':'employee'}
-    sources = [a for a in model.schedule.agents if a.type == source_type]
+    sources = model.agents_by_type.get(source_type, [])
     transmissions = 0
     for source in sources:
         for target, step in source.transmission_targets.items():
@@ -68,13 +81,13 @@ def calculate_R0(model, agent_types):
     return R0
 
 def calculate_finite_size_R0(model):
-    df = pd.DataFrame(columns=['ID', 'agent_type', 't', 'target'])
+    rows = []
     for a in model.schedule.agents:
         if a.transmissions > 0:
             for target in a.transmission_targets.keys():
-                df = df.append({'ID':a.ID, 'agent_type':a.type,
-                    't':a.transmission_targets[target], 'target':target},
-                            ignore_index=True)
+                rows.append({'ID':a.ID, 'agent_type':a.type,
+                    't':a.transmission_targets[target], 'target':target})
+    df = pd.DataFrame(rows, columns=['ID', 'agent_type', 't', 'target'])
                 
     # find first transmission(s)
     # NOTE: while it is very unlikely that two first transmissions occurred
@@ -93,13 +106,17 @@ def calculate_finite_size_R0(model):
     
 
 def count_infected_by_age(model, age_brackets):
+	# collect the ages of all infected students once and count them for every
+	# age bracket in a vectorized way
+	ages = np.asarray([a.age for a in model.agents_by_type.get('student', []) \
+	                  if a.recovered == True])
+
 	age_counts = {}
 	for ab in age_brackets:
 	    lower = int(ab.split('-')[0])
 	    upper = int(ab.split('-')[1])
 	    
-	    infected = len([a for a in model.schedule.agents if a.type == 'student' and \
-	               a.recovered == True and a.age >= lower and a.age <= upper])
+	    infected = int(((ages >= lower) & (ages <= upper)).sum())
 	    
 	    age_counts[ab] = infected
 
@@ -132,15 +149,17 @@ def get_statistics(df, col):
             '{}_std'.format(col):np.nan
         }
     else:
+        # determine all quantiles in a single call
+        quantiles = df[col].quantile([0.025, 0.10, 0.25, 0.75, 0.90, 0.975])
         return {
             '{}_mean'.format(col):df[col].mean(),
             '{}_median'.format(col):df[col].median(),
-            '{}_0.025'.format(col):df[col].quantile(0.025),
-            '{}_0.10'.format(col):df[col].quantile(0.10),
-            '{}_0.25'.format(col):df[col].quantile(0.25),
-            '{}_0.75'.format(col):df[col].quantile(0.75),
-            '{}_0.90'.format(col):df[col].quantile(0.90),
-            '{}_0.975'.format(col):df[col].quantile(0.975),
+            '{}_0.025'.format(col):quantiles[0.025],
+            '{}_0.10'.format(col):quantiles[0.10],
+            '{}_0.25'.format(col):quantiles[0.25],
+            '{}_0.75'.format(col):quantiles[0.75],
+            '{}_0.90'.format(col):quantiles[0.90],
+            '{}_0.975'.format(col):quantiles[0.975],
             '{}_std'.format(col):df[col].std(),
         }
 
@@ -216,8 +235,7 @@ def get_transmission_chain(model, school_type, teacher_schedule, student_schedul
         daycare_hours.remove(5)
 
 
-    tm_events = pd.DataFrame(columns=['day', 'weekday', 'hour',
-        'source_ID', 'source_type', 'target_ID', 'target_type'])
+    tm_events = []
 
     for a in model.schedule.agents:
         if a.transmissions > 0:
@@ -345,7 +363,7 @@ def get_transmission_chain(model, school_type, teacher_schedule, student_schedul
                 
                 assert not np.isnan(hour), 'schedule messup!'
                 assert len(location) > 0, 'location messup!'
-                tm_events = tm_events.append({
+                tm_events.append({
                     'day':step,
                     'weekday':weekday_map[weekday], 
                     'hour':hour,
@@ -353,9 +371,11 @@ def get_transmission_chain(model, school_type, teacher_schedule, student_schedul
                     'source_ID':a.ID,
                     'source_type':a.type,
                     'target_ID':target.ID,
-                    'target_type':target.type},
-                ignore_index=True)
+                    'target_type':target.type})
 
+    tm_events = pd.DataFrame(tm_events, columns=['day', 'weekday', 'hour',
+        'source_ID', 'source_type', 'target_ID', 'target_type', 'location'],
+        dtype=object)
 
     if len(tm_events) > 0:            
         tm_events['day'] = tm_events['day'].astype(int)
@@ -368,9 +388,9 @@ def get_transmission_chain(model, school_type, teacher_schedule, student_schedul
 
 def get_ensemble_observables_school(model, run):
     R0, _ = calculate_finite_size_R0(model)
-    N_school_agents = len([a for a in model.schedule.agents if \
-        a.type == 'teacher' or a.type == 'student'])
-    N_family_members = len([a for a in model.schedule.agents if a.type == 'family_member'])
+    N_school_agents = len(model.agents_by_type.get('teacher', [])) + \
+        len(model.agents_by_type.get('student', []))
+    N_family_members = len(model.agents_by_type.get('family_member', []))
     infected_students = count_infected(model, 'student')
     infected_teachers = count_infected(model, 'teacher')
     infected_family_members = count_infected(model, 'family_member')
@@ -453,6 +473,41 @@ def get_ensemble_observables_school(model, run):
     return row
 
 
+def run_seeded(run_model, run):
+    '''
+    Seeds numpy's and Python's global random number generators with the 
+    number of the run and calls run_model with it. Worker processes inherit
+    the random state of the parent process, such that runs that are not 
+    seeded would otherwise draw correlated random numbers.
+    '''
+    np.random.seed(run)
+    random.seed(run)
+    return run_model(run)
+
+
+def run_ensemble(run_model, N_runs, N_workers=None):
+    '''
+    Runs an ensemble of N_runs independent simulations in parallel and collects
+    their observables in a data frame. run_model is called with the number of
+    the run (0 to N_runs - 1) as its only argument and is expected to set up,
+    run and evaluate a single simulation, for example by returning the row
+    created by get_ensemble_observables_school(). Since simulations are
+    distributed over a pool of N_workers processes (defaults to the number of
+    available cores), run_model needs to be defined at module level such that
+    it can be pickled. Before every run, numpy's and Python's global random 
+    number generators are seeded with the run number (see run_seeded()). 
+    Models keep their own random number generator, therefore run_model also 
+    needs to pass the run number to the model as its seed, i.e. 
+    SEIRX_school(G, ..., seed=run). Then the ensemble is reproducible 
+    independent of the number of workers.
+    '''
+    with Pool(N_workers) as pool:
+        rows = pool.map(partial(run_seeded, run_model), range(N_runs))
+
+    ensemble_results = pd.DataFrame(rows)
+    return ensemble_results
+
+
 def compress_pickle(fname, fpath, data):
     success = False
     while not success:
@@ -475,23 +530,27 @@ def decompress_pickle(fname, fpath):
 def get_representative_run(N_infected, path):
     filenames = os.listdir(path)
     shuffle(filenames)
-    medians = {int(f.split('_')[1]):int(f.split('_')[3].split('.')[0]) \
-               for f in filenames}
-    dist = np.inf
-    closest_run = None
-    
-    for run, median in medians.items():
-        curr_dist = np.abs(N_infected - median)
-        if curr_dist < dist:
-            closest_run = run
-            dist = curr_dist
-        if curr_dist == 0:
-            break
+    runs = np.asarray([int(f.split('_')[1]) for f in filenames])
+    medians = np.asarray([int(f.split('_')[3].split('.')[0]) \
+               for f in filenames])
+
+    # first run (in shuffled order) with the smallest distance to N_infected
+    closest = np.argmin(np.abs(N_infected - medians))
             
-    fname = 'run_{}_N_{}.pbz2'.format(closest_run, medians[closest_run])
+    fname = 'run_{}_N_{}.pbz2'.format(runs[closest], medians[closest])
     return decompress_pickle(fname, path)
 
 
+# maps to encode measures in the file names of ensembles and JSON dumps (see
+# dump_JSON) and to decode them again (see get_measures)
+TURNOVERS = {'same':0, 'one':1, 'two':2, 'three':3}
+TURNOVER_NAMES = {0:'same', 1:'one', 2:'two', 3:'three'}
+BOOL_STRINGS = {True:'T', False:'F'}
+BOOL_MAP = {'T':True, 'F':False}
+INTERVAL_MAP = {'0':0, '3':3, '7':7, '14':14, 'None':None}
+INDEX_MAP = {'s':'student', 't':'teacher'}
+
+
 def dump_JSON(path, school,
               test_type, index_case, screen_frequency_student, 
               screen_frequency_teacher, teacher_mask, student_mask, half_classes,
@@ -511,9 +570,7 @@ def dump_JSON(path, school,
     students = school['students']
 
     turnover, _, ttype = test_type.split('_')
-    turnovers = {'same':0, 'one':1, 'two':2, 'three':3}
-    turnover = turnovers[turnover]
-    bool_dict = {True:'T', False:'F'}
+    turnover = TURNOVERS[turnover]
     
     node_list = json.loads(node_list.to_json(orient='split'))
     del node_list['index']
@@ -558,8 +615,8 @@ def dump_JSON(path, school,
        'turnover-{}_index-{}_tf-{}_'
        .format(turnover, index_case[0], screen_frequency_teacher) +\
        'sf-{}_tmask-{}_smask-{}'\
-       .format(screen_frequency_student, bool_dict[teacher_mask],\
-        bool_dict[student_mask]))
+       .format(screen_frequency_student, BOOL_STRINGS[teacher_mask],\
+        BOOL_STRINGS[student_mask]))
 
 
     if friendship_contacts:
@@ -576,7 +633,7 @@ def dump_JSON(path, school,
         fname = fname + '_trisk-{}'.format(trisk_mod)
 
     fname = fname + '_half-{}_vent-{}'\
-        .format(bool_dict[half_classes], ventilation_mod)
+        .format(BOOL_STRINGS[half_classes], ventilation_mod)
     fname = fname + fname_addition + '.txt'
 
     with open(fname,'w')\
@@ -606,11 +663,6 @@ def get_measures(measure_string, test_participation_rate=False,
                 'mask':False} 
 }
     
-    turnovers = {0:'same', 1:'one', 2:'two', 3:'three'}
-    bmap = {'T':True, 'F':False}
-    interval_map = {'0':0, '3':3, '7':7, '14':14, 'None':None}
-    index_map = {'s':'student', 't':'teacher'}
-    
     stype, _ = measure_string.split('_test')
     rest = measure_string.split(stype + '_')[1]
 
@@ -656,22 +708,22 @@ def get_measures(measure_string, test_participation_rate=False,
         if len(m) == 1:
             pass
         elif m[0] == 'test':
-            ttype = '{}_day_{}'.format(turnovers[int(tmp[2][1])], tmp[1][1])
+            ttype = '{}_day_{}'.format(TURNOVER_NAMES[int(tmp[2][1])], tmp[1][1])
             screening_params['preventive_test_type'] = ttype
         elif m[0] == 'turnover':
             pass
         elif m[0] == 'index':
-            screening_params['index_case'] = index_map[m[1]]
+            screening_params['index_case'] = INDEX_MAP[m[1]]
         elif m[0] == 'tf':
-            agents['teacher']['screening_interval'] = interval_map[m[1]]
+            agents['teacher']['screening_interval'] = INTERVAL_MAP[m[1]]
         elif m[0] == 'sf':
-            agents['student']['screening_interval'] = interval_map[m[1]]
+            agents['student']['screening_interval'] = INTERVAL_MAP[m[1]]
         elif m[0] == 'tmask':
-            agents['teacher']['mask'] = bmap[m[1]]    
+            agents['teacher']['mask'] = BOOL_MAP[m[1]]    
         elif m[0] == 'smask':
-            agents['student']['mask'] = bmap[m[1]]
+            agents['student']['mask'] = BOOL_MAP[m[1]]
         elif m[0] == 'half':
-            half = bmap[m[1]]
+            half = BOOL_MAP[m[1]]
         elif m[0] == 'vent':
             screening_params['transmission_risk_ventilation_modifier'] = float(m[1])
         elif m[0] == 'csizered':
@@ -701,7 +753,7 @@ def get_data(stype, src_path, test_participation_rate=False,
     Convenience function to read all ensembles from different measures
     of a given school type and return one single data frame
     '''
-    data = pd.DataFrame()
+    ensembles = []
     stype_path = join(src_path, stype)
     files = os.listdir(stype_path)
     for f in files:
@@ -739,8 +791,13 @@ def get_data(stype, src_path, test_participation_rate=False,
             
         if transmission_risk_modifier:
             ensmbl['transmission_risk_modifier'] = screening_params['transmission_risk_modifier']
-        data = pd.concat([data, ensmbl])
+        ensembles.append(ensmbl)
+
+    assert len(ensembles) > 0, 'no ensembles found in {}'.format(stype_path)
 
+    # concatenate all ensembles at once instead of copying the growing data
+    # frame for every file
+    data = pd.concat(ensembles)
     data = data.reset_index(drop=True)
     data['teacher_screening_interval'] = data['teacher_screening_interval'].replace({None:'never'})
     data['student_screening_interval'] = data['student_screening_interval'].replace({None:'never'})
@@ -1,3 +1,6 @@
+import csv
+from itertools import combinations, product
+
 import networkx as nx
 import numpy as np
 import pandas as pd
@@ -84,6 +87,24 @@ def get_teaching_framework():
 
 	return max_hours, N_weekdays, weekend_days
 
+def get_class_units(N_classes):
+	"""
+	Create the labels of the units (classrooms) of all classes in the school. 
+	The labels are created once and looked up wherever the unit of a class is
+	needed, instead of formatting the label for every use.
+
+	Parameters
+	----------
+	N_classes : int
+		Number of classes in the school.
+
+	Returns
+	-------
+	class_units : dictionary
+		Dictionary of the form {1:'class_1', ..., N_classes:'class_N'}
+	"""
+	return {c:'class_{}'.format(c) for c in range(1, N_classes + 1)}
+
 def get_floor_distribution(N_floors, N_classes):
 	"""
 	Distribute the number of classes evenly over the number of available floors.
@@ -131,10 +152,7 @@ def get_floor_distribution(N_floors, N_classes):
 						classes_per_floor - 1]
 				
 	# invert dict for easier use
-	floors_inv = {}
-	for floor, classes in floors.items():
-		for c in classes:
-			floors_inv.update({c:floor})
+	floors_inv = {c:floor for floor, classes in floors.items() for c in classes}
 	
 	return floors, floors_inv
 
@@ -196,10 +214,8 @@ def get_age_distribution(school_type, N_classes):
 					  classes_per_age_bracket - 1]
 	
 	# invert dict for easier use
-	age_bracket_map_inv = {}
-	for age_bracket, classes in age_bracket_map.items():
-		for c in classes:
-			age_bracket_map_inv.update({c:age_bracket})            
+	age_bracket_map_inv = {c:age for age, classes in age_bracket_map.items() \
+						   for c in classes}
 				
 	return age_bracket_map_inv
 
@@ -211,6 +227,19 @@ def get_age_distribution(school_type, N_classes):
 ###							###
 ###############################
 
+def get_choices(p):
+	"""
+	Split a dictionary of the form {choice:probability} into an array of
+	choices and an array of probabilities, as expected by np.random.choice(). 
+	Tuples of the form (choices, probabilities) that have already been split
+	are returned unchanged.
+	"""
+	if isinstance(p, dict):
+		return np.fromiter(p.keys(), dtype=int, count=len(p)), \
+			   np.fromiter(p.values(), dtype=float, count=len(p))
+	return p
+
+
 
 def generate_student_family(school_type, p_children, p_parents):
 	"""
@@ -229,10 +258,13 @@ def generate_student_family(school_type, p_children, p_parents):
 		get_age_bracket().
 	p_children : dictionary
 		Probabilities for the number of children in a family household, given 
-		that there is at least one child.
+		that there is at least one child. Can also be passed as tuple of 
+		(choices, probabilities) as returned by get_choices().
 	p_parents : dictionary
 		Given the number of children, probability that the family has 1 or 2 
-		parents.
+		parents. The probabilities for a given number of children can also be
+		passed as tuple of (choices, probabilities) as returned by 
+		get_choices().
 					 
 	Returns
 	-------
@@ -242,17 +274,17 @@ def generate_student_family(school_type, p_children, p_parents):
 		Number of parents (1 or 2) in the family. Sorry for the approximation to
 		families that have a maximum of two parents.
 	"""
-	age_bracket = get_age_bracket(school_type)
-	N_children = np.random.choice(list(p_children.keys()), 
-								  p=list(p_children.values()))
-	N_parents = np.random.choice(list(p_parents[N_children].keys()),
-								p=list(p_parents[N_children].values()))
+	age_bracket = set(get_age_bracket(school_type))
+	children, p = get_choices(p_children)
+	N_children = np.random.choice(children, p=p)
+	parents, p = get_choices(p_parents[N_children])
+	N_parents = np.random.choice(parents, p=p)
 
 	while True:
 		# random ages of children from uniform distribution
 		ages = np.random.randint(0, 18, N_children)
 		# does at least one child qualify to go to the school?
-		if len(set(age_bracket).intersection(set(ages))) > 0:
+		if not age_bracket.isdisjoint(ages):
 			return ages, N_parents
 
 
@@ -278,11 +310,49 @@ def generate_teacher_family(p_adults, p_children):
 	N_adults : int
 		Number of adults (1, 2 and 3) in the family.
 	"""
-	N_adults = np.random.choice(list(p_adults.keys()), p=list(p_adults.values()))
-	N_children = np.random.choice(list(p_children[N_adults].keys()),
-								p=list(p_children[N_adults].values()))
+	ages, N_adults = generate_teacher_families(p_adults, p_children, 1)
+	return ages[0], N_adults[0]
+
+
+def generate_teacher_families(p_adults, p_children, N_families):
+	"""
+	Generate a number of teacher families at once. The family sizes follow the
+	same distribution as in generate_teacher_family(), but the number of adults,
+	the number of children and the ages of all children are drawn for all 
+	families with a single call to the random number generator each.
 	
-	ages = np.random.randint(0, 18, N_children)
+	Parameters
+	----------
+	p_adults : dictionary
+		Probabilities for the number of adults in a family household.
+	p_children : dictionary
+		Given the number of adults, probability that the family has 1, 2 or 3 
+		children.
+	N_families : int
+		Number of families to generate.
+					 
+	Returns
+	-------
+	ages : list
+		List of length N_families with the ages of the children in every 
+		generated family.
+	N_adults : numpy array
+		Number of adults (1, 2 and 3) in every family.
+	"""
+	adults, p = get_choices(p_adults)
+	N_adults = np.random.choice(adults, size=N_families, p=p)
+
+	# draw the number of children for all families with the same number of 
+	# adults at once
+	N_children = np.zeros(N_families, dtype=int)
+	for N_family_adults in p_adults.keys():
+		idx = np.where(N_adults == N_family_adults)[0]
+		if len(idx) > 0:
+			children, p = get_choices(p_children[N_family_adults])
+			N_children[idx] = np.random.choice(children, size=len(idx), p=p)
+	
+	ages = np.random.randint(0, 18, N_children.sum())
+	ages = np.split(ages, np.cumsum(N_children)[0:-1])
 	return ages, N_adults
 
 
@@ -332,9 +402,15 @@ def generate_students(G, school_type,N_classes,class_size,p_children,p_parents):
 	family_counter = 1
 	family_member_counter = 1
 
+	# split the family size distributions into arrays of choices and 
+	# probabilities once, instead of for every generated family
+	p_children = get_choices(p_children)
+	p_parents = {N_children:get_choices(p) for N_children, p in \
+				 p_parents.items()}
+
 	# generate students and their families until the school is full
-	while (np.asarray([N_target_students[age] for age in age_bracket]) - \
-		np.asarray([N_current_students[age] for age in age_bracket])).sum() > 0:
+	while sum(N_target_students[age] - N_current_students[age] \
+		for age in age_bracket) > 0:
 
 
 		ages, N_parents = generate_student_family(school_type, p_children,
@@ -358,46 +434,36 @@ def generate_students(G, school_type,N_classes,class_size,p_children,p_parents):
 				# the final small "s" such that s1 is the first student of the
 				# first class and sN is the last student in the last class.
 				student_ID = 'S{:04d}'.format(student_counter)
-				G.add_node(student_ID)
-				nx.set_node_attributes(G, \
-						{student_ID:{'type':'student',
-									 'age':age,
-									 'family':family_counter}})
 				student_counter += 1
 				fits_in_school.append(age)
-				student_nodes.append(student_ID)
+				student_nodes.append((student_ID, {'age':age}))
 				N_current_students[age] += 1
 			else:
 				doesnt_fit.append(age)
 
 		# at least one of the children did fit into the school:
 		if len(fits_in_school) > 0:
+			# add the students to the graph, node attributes shared by all
+			# members of the family are passed once for all nodes
+			G.add_nodes_from(student_nodes, type='student', 
+							 family=family_counter)
+
 			# add the students that didn't fit into the school as family members
 			for age in doesnt_fit:
 				family_member_ID = 'f{:04d}'.format(family_member_counter)
-				G.add_node(family_member_ID)
-				nx.set_node_attributes(G, \
-						{family_member_ID:{'type':'family_member',
-										   'age':age,
-										   'family':family_counter,
-										   'unit':'family'}})
-				family_nodes.append(family_member_ID)
+				family_nodes.append((family_member_ID, {'age':age}))
 				family_member_counter += 1
 
 			# parents
 			for parent in range(N_parents):
 				family_member_ID = 'f{:04d}'.format(family_member_counter)
-				G.add_node(family_member_ID)
-				nx.set_node_attributes(G, \
-						{family_member_ID:{'type':'family_member',
-											# Note: 20.5 is the age at which
-											# the symptom and transmission risk
-											# is that of an adult
-										   'age':20.5,
-										   'family':family_counter,
-										   'unit':'family'}})
+				# Note: 20.5 is the age at which the symptom and transmission
+				# risk is that of an adult
+				family_nodes.append((family_member_ID, {'age':20.5}))
 				family_member_counter += 1
-				family_nodes.append(family_member_ID)
+
+			G.add_nodes_from(family_nodes, type='family_member',
+							 family=family_counter, unit='family')
 
 			# increase the family counter by one
 			family_counter += 1
@@ -441,38 +507,32 @@ def generate_teachers(G, school_type, N_classes, family_member_counter,
 	"""
 	N_teachers = get_N_teachers(school_type, N_classes)
 	teacher_nodes = ['t{:04d}'.format(i) for i in range(1, N_teachers + 1)]
-	G.add_nodes_from(teacher_nodes)
+	# every teacher forms a new family, the family labels of the teachers 
+	# therefore increase sequentially starting from the current family counter
+	# Note: 20.5 is the age at which the symptom and transmission risk is that
+	# of an adult
+	G.add_nodes_from(((t, {'family':family_counter + i}) for i, t in \
+		enumerate(teacher_nodes)), type='teacher', age=20.5, 
+		unit='faculty_room')
+
+	# draw a random number of children and adults for the families of all 
+	# teachers at once
+	family_ages, family_adults = generate_teacher_families(teacher_p_adults,
+									teacher_p_children, N_teachers)
 	
-	for t in teacher_nodes:
-		family_nodes = [t]
-		# draw a random number of children and adults for the family
-		ages, N_adults = generate_teacher_family(teacher_p_adults, teacher_p_children)
-		
+	for ages, N_adults in zip(family_ages, family_adults):
 		ages = list(ages)
 		for adult in range(N_adults - 1):
 			ages.append(20.5) # default age for adults
 		
 		# add the family member nodes and their attributes to the graph
+		family_nodes = []
 		for age in ages:
 			family_member_ID = 'f{:04d}'.format(family_member_counter)
-			family_nodes.append(family_member_ID)
-			G.add_node(family_member_ID)
+			family_nodes.append((family_member_ID, {'age':age}))
 			family_member_counter += 1
-			nx.set_node_attributes(G, \
-						{family_member_ID:{'type':'family_member',
-										   'age':age,
-										   'family':family_counter,
-										   'unit':'family'}})
-					
-		# finally, also set the teacher's node attributes
-		nx.set_node_attributes(G, \
-					{t:{'type':'teacher', 
-						# Note: 20.5 is the age at which
-						# the symptom and transmission risk
-						# is that of an adult
-						'age':20.5,
-						'unit':'faculty_room',
-						'family':family_counter}})
+		G.add_nodes_from(family_nodes, type='family_member', 
+						 family=family_counter, unit='family')
 		family_counter += 1
 
 
@@ -514,15 +574,17 @@ def assign_classes(G, school_type, class_size, N_classes, N_floors):
 	# relations of classes based on spatial proximity
 	floors, floors_inv = get_floor_distribution(N_floors, N_classes)
 
+	# group all student nodes by their age in a single pass over the graph
 	all_students = {age:[] for age in age_bracket}
+	for n, data in G.nodes(data=True):
+		if data['type'] == 'student' and data['age'] in all_students:
+			all_students[data['age']].append(n)
 	class_counter = 1
+	class_units = get_class_units(N_classes)
 	sequential_students = []
 	_, N_weekdays, weekend_days = get_teaching_framework()
 
 	for age in age_bracket:
-		# get all student nodes with one age
-		all_students[age] = [n[0] for n in G.nodes(data=True) if \
-							 n[1]['type'] == 'student' and n[1]['age'] == age]
 		sequential_students.extend(all_students[age])
 
 		# split the students of the same ages into classes of size class_size
@@ -530,11 +592,10 @@ def assign_classes(G, school_type, class_size, N_classes, N_floors):
 			students_in_class = all_students[age][\
 				i * class_size: (i + 1) * class_size]
 
-			for s in students_in_class:
-				# add class information to student node in graph
-				nx.set_node_attributes(G, {s:{
-								'unit':'class_{}'.format(class_counter),
-								'floor':floors_inv[class_counter]}})
+			# add class information to the student nodes in the graph
+			G.add_nodes_from(students_in_class, 
+							 unit=class_units[class_counter],
+							 floor=floors_inv[class_counter])
 
 			class_counter += 1
 
@@ -552,6 +613,32 @@ def assign_classes(G, school_type, class_size, N_classes, N_floors):
 ###							###	
 ###############################
 
+def get_class_students(G):
+	"""
+	Group the student nodes in the graph by the class they are assigned to.
+	The graph is only traversed once, which avoids repeated scans over all
+	nodes when contacts are set for every class.
+
+	Parameters
+	----------
+	G : networkx Graph or MultiGraph
+		Graph holding the agents (students, teachers, household members) of the
+		school as nodes and their contacts as edges. Student nodes need to have
+		the node attribute 'unit' set (see assign_classes()).
+
+	Returns
+	-------
+	class_students : dict
+		Dictionary of the form {'class_i':[student IDs]}. Students are listed in
+		the order they are stored in the graph.
+	"""
+	class_students = {}
+	for n, data in G.nodes(data=True):
+		if data['type'] == 'student':
+			class_students.setdefault(data['unit'], []).append(n)
+	return class_students
+
+
 def set_family_contacts(G):
 	"""
 	Set the household contacts between members of the same household.
@@ -585,21 +672,16 @@ def set_family_contacts(G):
 
 		# Links between household members form a complete subgraph of all
 		# members of the household with the corresponding link type.
-		for f1 in family_members:
-			for f2 in family_members:
-				if f1 != f2:
-					# The alphabetic sorting of node IDs is necessary to ensure 
-					# the edge key is always composed of the node with the lower
-					# ID counter first. Otherwise we would get duplicate edges 
-					# with permuted node IDs and different keys.
-					tmp = [f1, f2]
-					tmp.sort()
-					n1, n2 = tmp
-					for wd in range(1, N_weekdays + 1):
-						G.add_edge(n1, n2, link_type = link_type,
-										   weekday = wd,
-										   key = n1 + n2 + 'd{}'.format(wd))
-					
+		# The alphabetic sorting of node IDs is necessary to ensure the edge 
+		# key is always composed of the node with the lower ID counter first. 
+		# Otherwise we would get duplicate edges with permuted node IDs and 
+		# different keys.
+		family_members.sort()
+		G.add_edges_from((n1, n2, n1 + n2 + 'd{}'.format(wd),
+						  {'link_type':link_type, 'weekday':wd}) \
+						  for n1, n2 in combinations(family_members, 2) \
+						  for wd in range(1, N_weekdays + 1))
+
 
 
 def set_student_student_intra_class_contacts(G, N_classes):
@@ -618,65 +700,40 @@ def set_student_student_intra_class_contacts(G, N_classes):
 		Number of classes in the school.
 	"""
 	_, N_weekdays, weekend_days = get_teaching_framework()
+	class_students = get_class_students(G)
+	class_units = get_class_units(N_classes)
+
+	# the seating arrangement does not change over the week, therefore the
+	# sorted student list and the table neighbour relations of every class 
+	# are only determined once. Students sit next to each other in a ring, 
+	# i.e. student i sits next to student (i + 1) modulo the class size. 
+	# Table neighbour pairs are stored with the lower node ID first.
+	classes = []
+	for c in range(1, N_classes + 1):
+		students_in_class = sorted(class_students.get(class_units[c], []))
+		table_neighbours = {(min(n1, n2), max(n1, n2)) for n1, n2 in \
+			zip(students_in_class, students_in_class[1:] + students_in_class[:1])}
+		classes.append((students_in_class, table_neighbours))
 
 	for wd in range(1, N_weekdays + 1):
 		if wd not in weekend_days:
 			wd_string = 'd{}'.format(wd)
-			for c in range(1, N_classes + 1):
-				students_in_class = [n for n, u in G.nodes(data='unit') if \
-					u == 'class_{}'.format(c)]
-				students_in_class.sort()
-
+			for students_in_class, table_neighbours in classes:
 				# add intra_class links between all students in the same class
-				# as complete subgraph
-				for s1 in students_in_class:
-					for s2 in students_in_class:
-						if s1 != s2:
-							# The alphabetic sorting of node IDs is necessary to
-							# ensure the edge key is always composed of the 
-							# node with the lower ID counter first. Otherwise we
-							# would get duplicate edges with permuted node IDs 
-							# and different keys.
-							tmp = [s1, s2]
-							tmp.sort()
-							n1, n2 = tmp
-
-							G.add_edge(n1, n2, \
-								link_type = 'student_student_intra_class',
-								weekday = wd,
-								key = n1 + n2 + wd_string)
-
-				# add table neighbour relations to students in a ring
-				for i, n in enumerate(students_in_class[0:-1]):
-					s1 = students_in_class[i - 1]
-					tmp = [s1, n]
-					tmp.sort()
-					n1, n2 = tmp
-					G.add_edge(n1, n2, \
-						link_type = 'student_student_table_neighbour',
-						weekday = wd,
-						key = n1 + n2 + wd_string)
-
-					s1 = students_in_class[i + 1]
-					tmp = [s1, n]
-					tmp.sort()
-					n1, n2 = tmp
-					G.add_edge(n1, n2, \
-						link_type = 'student_student_table_neighbour',
-						weekday = wd,
-						key = n1 + n2 + wd_string)
-
-				# add the contacts for the last student separately, since 
-				# this would exceed the list indexing otherwise
-				s1 = students_in_class[0]
-				s2 = students_in_class[-1]
-				tmp = [s1, s2]
-				tmp.sort()
-				s1, s2 = tmp
-				G.add_edge(s1, s2,
-					link_type = 'student_student_table_neighbour',
-					weekday = wd,
-					key = s1 + s2 + wd_string)
+				# as complete subgraph. Pairs of table neighbours get the 
+				# (stronger) table neighbour link type directly, such that every
+				# edge is only written once.
+				# Note: the alphabetic sorting of node IDs (guaranteed by 
+				# combinations() on the sorted list) is necessary to ensure the
+				# edge key is always composed of the node with the lower ID 
+				# counter first. Otherwise we would get duplicate edges with 
+				# permuted node IDs and different keys.
+				G.add_edges_from((n1, n2, n1 + n2 + wd_string, 
+					{'link_type':'student_student_table_neighbour' \
+						if (n1, n2) in table_neighbours \
+						else 'student_student_intra_class',
+					 'weekday':wd}) \
+					for n1, n2 in combinations(students_in_class, 2))
 
 
 def set_teacher_teacher_social_contacts(G, school_type, N_classes,
@@ -719,6 +776,13 @@ def set_teacher_teacher_social_contacts(G, school_type, N_classes,
 
 	_, N_weekdays, weekend_days = get_teaching_framework()
 
+	# pairs of teachers that are already in contact, stored with the lower node 
+	# ID first. Keeping track of these pairs in a set avoids querying the 
+	# graph's adjacency for every sampled candidate pair.
+	teacher_set = set(teacher_nodes)
+	teacher_pairs = {(min(t1, t2), max(t1, t2)) for t1, t2 in \
+		G.edges(teacher_nodes) if t2 in teacher_set}
+
 	# total number of unique far contacts that will be generated. The division
 	# by two ensures the ratio of far contacts to other teachers corresponds to
 	# the given ratio, since every edge connects two teachers and is therefore
@@ -731,10 +795,9 @@ def set_teacher_teacher_social_contacts(G, school_type, N_classes,
 		if t1 == t2:
 			continue
 
-		if not G.has_edge(t1, t2):
-			tmp = [t1, t2]
-			tmp.sort()
-			t1, t2 = tmp
+		t1, t2 = min(t1, t2), max(t1, t2)
+		if not (t1, t2) in teacher_pairs:
+			teacher_pairs.add((t1, t2))
 			for wd in range(1, N_weekdays + 1):
 				if not wd in weekend_days:
 					G.add_edge(t1, t2, link_type='teacher_teacher_short',
@@ -752,10 +815,9 @@ def set_teacher_teacher_social_contacts(G, school_type, N_classes,
 		if t1 == t2:
 			continue
 
-		if not G.has_edge(t1, t2):
-			tmp = [t1, t2]
-			tmp.sort()
-			t1, t2 = tmp
+		t1, t2 = min(t1, t2), max(t1, t2)
+		if not (t1, t2) in teacher_pairs:
+			teacher_pairs.add((t1, t2))
 			for wd in range(1, N_weekdays + 1):
 				if not wd in weekend_days:
 					G.add_edge(t1, t2, link_type = 'teacher_teacher_long',
@@ -771,11 +833,13 @@ def _set_teaching_contacts(G, teacher_schedule, student_schedule,
 		wd_teacher_schedule = teacher_schedule.loc[wd]
 		wd_student_schedule = student_schedule.loc[wd]
 
+		wd_string = 'd{}'.format(wd)
+
 		# morning classes: create links between the teachers and all students
 		# in the classes taught by the teachers
 		for hour in range(1, teaching_hours + 1):
+			hour_col = 'hour_{}'.format(hour)
 			for c in range(1, N_classes + 1):
-				hour_col = 'hour_{}'.format(hour)
 				# teachers teaching a given class in a given hour during a 
 				# given day
 				teachers = wd_teacher_schedule[hour_col][\
@@ -785,13 +849,10 @@ def _set_teaching_contacts(G, teacher_schedule, student_schedule,
 				students = wd_student_schedule[hour_col][\
 					wd_student_schedule[hour_col] == c].index
 
-				for t in teachers:
-					for s in students:
-						key = s + t + 'd{}'.format(wd)
-						# no sorting needed, student nodes come first
-						G.add_edge(s, t, link_type = 'teaching_teacher_student',
-										 weekday = wd,
-										 key = key)
+				# no sorting needed, student nodes come first
+				G.add_edges_from((s, t, s + t + wd_string,
+					{'link_type':'teaching_teacher_student', 'weekday':wd}) \
+					for s, t in product(students, teachers))
 
 def set_teacher_student_teaching_contacts(G, school_type, N_classes, 
 										  teacher_schedule, student_schedule):
@@ -979,22 +1040,16 @@ def set_teacher_teacher_daycare_supervision_contacts(G, school_type,
 
 					# in theory a daycare group can be supervised by more than 
 					# two teachers. Create contacts between all of the teachers
-					# supervising the same group
-					for t1 in supervising_teachers:
-						for t2 in supervising_teachers:
-							if t1 != t2:
-								# The alphabetic sorting of node IDs is necessary to
-								# ensure the edge key is always composed of the 
-								# node with the lower ID counter first. Otherwise we
-								# would get duplicate edges with permuted node IDs 
-								# and different keys.
-								teachers = [t1, t2]
-								teachers.sort()
-								n1, n2 = teachers
-								G.add_edge(n1, n2,\
-								link_type='teacher_teacher_daycare_supervision',
-								weekday=wd,
-								key=n1 + n2 + 'd{}'.format(wd))
+					# supervising the same group.
+					# The alphabetic sorting of node IDs is necessary to ensure
+					# the edge key is always composed of the node with the 
+					# lower ID counter first. Otherwise we would get duplicate 
+					# edges with permuted node IDs and different keys.
+					G.add_edges_from((n1, n2, n1 + n2 + 'd{}'.format(wd),
+						{'link_type':'teacher_teacher_daycare_supervision',
+						 'weekday':wd}) \
+						for n1, n2 in combinations(
+							sorted(supervising_teachers), 2))
 
 
 def set_teacher_student_daycare_supervision_contacts(G, school_type, N_classes,
@@ -1065,12 +1120,10 @@ def set_teacher_student_daycare_supervision_contacts(G, school_type, N_classes,
 					students = wd_student_schedule[hour_col][\
 						wd_student_schedule[hour_col] == daycare_group].index
 
-					for t in teachers:
-						for s in students:
-							G.add_edge(s, t, 
-								link_type = 'daycare_supervision_teacher_student',
-								weekday = wd,
-								key = s + t + 'd{}'.format(wd))
+					G.add_edges_from((s, t, s + t + 'd{}'.format(wd),
+						{'link_type':'daycare_supervision_teacher_student',
+						 'weekday':wd}) \
+						for s, t in product(students, teachers))
 
 
 def set_student_student_daycare_contacts(G, school_type, student_schedule):
@@ -1116,22 +1169,14 @@ def set_student_student_daycare_contacts(G, school_type, student_schedule):
 					students = wd_schedule[hour_col][\
 						wd_schedule[hour_col] == daycare_group].index
 
-					for s1 in students:
-						for s2 in students:
-							if s1 != s2:
-								# The alphabetic sorting of node IDs is 
-								# necessary to ensure the edge key is always 
-								# composed of the  node with the lower ID 
-								# counter first. Otherwise we would get 
-								# duplicate edges with permuted node IDs and 
-								# different keys.
-								tmp = [s1, s2]
-								tmp.sort()
-								n1, n2 = tmp
-								G.add_edge(s1, s2, \
-									link_type = 'student_student_daycare',
-									weekday = wd,
-									key = n1 + n2 + 'd{}'.format(wd))
+					# The alphabetic sorting of node IDs is necessary to ensure 
+					# the edge key is always composed of the node with the 
+					# lower ID counter first. Otherwise we would get duplicate
+					# edges with permuted node IDs and different keys.
+					G.add_edges_from((n1, n2, n1 + n2 + 'd{}'.format(wd),
+						{'link_type':'student_student_daycare',
+						 'weekday':wd}) \
+						for n1, n2 in combinations(sorted(students), 2))
 
 
 ###########################
@@ -1140,6 +1185,31 @@ def set_student_student_daycare_contacts(G, school_type, student_schedule):
 ###						###
 ###########################
 
+def _get_empty_schedule(nodes):
+	"""
+	Create an empty schedule for the given nodes, i.e. an object array of shape
+	N_weekdays X N_nodes X N_hours, where N_hours is the total number of hours
+	typically spent at school at maximum (=9). All entries are NaN.
+	"""
+	max_hours, N_weekdays, _ = get_teaching_framework()
+	return np.full((N_weekdays, len(nodes), max_hours), np.nan, dtype=object)
+
+
+def _schedule_to_frame(schedule, nodes, node_type):
+	"""
+	Convert a schedule array of shape N_weekdays X N_nodes X N_hours (see 
+	_get_empty_schedule()) into a DataFrame of the form (N_nodes * N_weekdays) X 
+	N_hours with a hierarchical index of form [weekday, node_type].
+	"""
+	max_hours, N_weekdays, _ = get_teaching_framework()
+	iterables = [range(1, N_weekdays + 1), nodes]
+	index = pd.MultiIndex.from_product(iterables, names=['weekday', node_type])
+	return pd.DataFrame(schedule.reshape((N_weekdays * len(nodes), max_hours)),
+						index=index, 
+						columns=['hour_{}'.format(i) for i in \
+							range(1, max_hours + 1)])
+
+
 
 def generate_student_schedule(school_type, N_classes, class_size, \
 		student_offset=0):
@@ -1212,70 +1282,64 @@ def generate_student_schedule(school_type, N_classes, class_size, \
 			i in range(1 + student_offset,
 					   N_classes * class_size + 1 + student_offset)]
 
-
-	student_schedule = pd.DataFrame(columns=['student'] + \
-					['hour_{}'.format(i) for i in range(1, max_hours + 1)])
-	student_schedule['student'] = student_nodes * N_weekdays
-
-	# create a hierarchical index of form [weekday, student]
-	iterables = [range(1, 8), student_nodes]
-	index = pd.MultiIndex.from_product(iterables, names=['weekday', 'student'])
-	student_schedule.index = index
-	student_schedule = student_schedule.drop(columns=['student'])
-
 	if daycare_ratio > 0:
 		# pick a number of students at random to participate in full daycare
 		daycare_students = np.random.choice(student_nodes, \
 				   int((N_classes * class_size) * daycare_ratio), replace=False)
+		# membership is checked against a set instead of scanning the array
+		# of daycare students for every student
+		daycare_set = set(daycare_students)
 		non_daycare_students = [s for s in student_nodes if \
-								 s not in daycare_students]
+								 s not in daycare_set]
 	else:
 		daycare_students = []
 		non_daycare_students = student_nodes
 
-	for wd in range(1, N_weekdays + 1):
-		# weekend: all students are at home
-		if wd in weekend_days:
-			for s in student_nodes:
-				for hour in range(1, max_hours + 1):
-					student_schedule.loc[wd, s]['hour_{}'.format(hour)] = pd.NA
-						
-		# weekdays: students are distributed across classes
+	# the schedule is filled as array of form N_weekdays X N_students X N_hours
+	# and converted to a DataFrame with a hierarchical index of form 
+	# [weekday, student] in the end
+	schedule = _get_empty_schedule(student_nodes)
+	teaching_days = [wd - 1 for wd in range(1, N_weekdays + 1) \
+					 if wd not in weekend_days]
+	# position of the students in the schedule, necessary to ensure classrooms
+	# are assigned correctly, even if there is a student offset (in the case 
+	# of secondary_dc)
+	student_idx = {s:i for i, s in enumerate(student_nodes)}
+
+	# weekend: all students are at home
+	for wd in weekend_days:
+		schedule[wd - 1] = pd.NA
+
+	# weekdays: students are distributed across classes
+	# students are distributed to classes evenly, starting by s1 in class 1 
+	# to student s N_classes * class_size in class N
+	classrooms = [int((int(s[1:]) - 1) / class_size) + 1 for s in student_nodes]
+	for hour in N_teaching_hours:
+		if hour == 5: # lunchbreak
+			schedule[teaching_days, :, hour - 1] = pd.NA
 		else:
-			for s in student_nodes:
-				# necessary to ensure classromms are assigned correctly, even
-				# if there is a student offset (in the case of secondary_dc)
-				i = int(s[1:])
-
-				# teaching hours
-				for hour in N_teaching_hours:
-					if hour == 5: # lunchbreak
-						classroom = pd.NA
-						student_schedule.loc[wd, s]['hour_{}'.format(hour)] = classroom
-					else:
-						# students are distributed to classes evenly, starting by s1
-						# in class 1 to student s N_classes * class_size in class N
-						classroom = int((i - 1)/ class_size) + 1
-						student_schedule.loc[wd,s]['hour_{}'.format(hour)]=classroom
-
-			for i, s in enumerate(daycare_students):
-				# daycare hours
-				for hour in N_daycare_hours:
-					# students in daycare are distributed evenly to the newly 
-					# formed daycare group. Since these students (and their 
-					# order) are randomly picked, the daycare groups also create
-					# new contacts between  students, which are later set by the
-					# function generate_student_daycare_contacts
-					classroom = int((i - 1) / class_size) + 1
-					student_schedule.loc[wd,s]['hour_{}'.format(hour)]=classroom
-
-			for s in non_daycare_students:
-				i = int(s[1:])
-				# daycare hours
-				for hour in N_daycare_hours:
-					classroom = pd.NA
-					student_schedule.loc[wd,s]['hour_{}'.format(hour)]=classroom
-
+			schedule[teaching_days, :, hour - 1] = classrooms
+
+	daycare_hours = [hour - 1 for hour in N_daycare_hours]
+	if len(daycare_hours) > 0:
+		# students in daycare are distributed evenly to the newly formed 
+		# daycare group. Since these students (and their order) are randomly
+		# picked, the daycare groups also create new contacts between 
+		# students, which are later set by the function 
+		# generate_student_daycare_contacts
+		if len(daycare_students) > 0:
+			daycare_idx = [student_idx[s] for s in daycare_students]
+			daycare_classrooms = np.asarray([int((i - 1) / class_size) + 1 \
+				for i in range(len(daycare_students))], dtype=object)
+			schedule[np.ix_(teaching_days, daycare_idx, daycare_hours)] = \
+				daycare_classrooms[np.newaxis, :, np.newaxis]
+
+		if len(non_daycare_students) > 0:
+			non_daycare_idx = [student_idx[s] for s in non_daycare_students]
+			schedule[np.ix_(teaching_days, non_daycare_idx, daycare_hours)] = \
+				pd.NA
+
+	student_schedule = _schedule_to_frame(schedule, student_nodes, 'student')
 	student_schedule = student_schedule.replace({np.nan:pd.NA})
 	return student_schedule
 
@@ -1340,19 +1404,13 @@ def generate_teacher_schedule_primary(N_classes):
 			schedule[t].append(pd.NA)
 
 	# convert the schedule to a data frame
-	schedule_df = pd.DataFrame(columns=['teacher'] + ['hour_{}'.format(i)\
-				 for i in range(1, max_hours + 1)])
-	schedule_df['teacher'] = teacher_nodes * N_weekdays
-	iterables = [range(1, N_weekdays + 1), teacher_nodes]
-	index = pd.MultiIndex.from_product(iterables, names=['weekday', 'teacher'])
-	schedule_df.index = index
-	schedule_df = schedule_df.drop(columns = ['teacher'])
-
-	for wd in range(1, N_weekdays + 1):
-		for t in teacher_nodes:
-			for hour, c in enumerate(schedule[t]):
-				if wd not in weekend_days:
-					schedule_df.loc[wd, t]['hour_{}'.format(hour + 1)] = c
+	schedule_arr = _get_empty_schedule(teacher_nodes)
+	teaching_days = [wd - 1 for wd in range(1, N_weekdays + 1) \
+					 if wd not in weekend_days]
+	for i, t in enumerate(teacher_nodes):
+		hours = schedule[t][0:max_hours]
+		schedule_arr[teaching_days, i, 0:len(hours)] = hours
+	schedule_df = _schedule_to_frame(schedule_arr, teacher_nodes, 'teacher')
 
 	return schedule_df
 
@@ -1424,19 +1482,13 @@ def generate_teacher_schedule_primary_daycare(N_classes):
 		schedule['t{:04d}'.format(i)].extend(\
 				[pd.NA] * (max_hours - N_teaching_hours))
 		
-	schedule_df = pd.DataFrame(columns=['teacher'] + \
-					['hour_{}'.format(i) for i in range(1, max_hours + 1)])
-	schedule_df['teacher'] = teacher_nodes * N_weekdays
-	iterables = [range(1, N_weekdays + 1), teacher_nodes]
-	index = pd.MultiIndex.from_product(iterables, names=['weekday', 'teacher'])
-	schedule_df.index = index
-	schedule_df = schedule_df.drop(columns = ['teacher'])
-
-	for wd in range(1, N_weekdays + 1):
-		for t in teacher_nodes:
-			for hour, c in enumerate(schedule[t]):
-				if wd not in weekend_days:
-					schedule_df.loc[wd, t]['hour_{}'.format(hour + 1)] = c
+	schedule_arr = _get_empty_schedule(teacher_nodes)
+	teaching_days = [wd - 1 for wd in range(1, N_weekdays + 1) \
+					 if wd not in weekend_days]
+	for i, t in enumerate(teacher_nodes):
+		hours = schedule[t][0:max_hours]
+		schedule_arr[teaching_days, i, 0:len(hours)] = hours
+	schedule_df = _schedule_to_frame(schedule_arr, teacher_nodes, 'teacher')
 
 	return schedule_df
 
@@ -1482,63 +1534,35 @@ def generate_teacher_schedule_lower_secondary(N_classes):
 	teacher_list.extend(list(range(2, N_teachers + 1)))
 	teacher_list.extend(list(range(1, N_teachers + 1)) + [1])
 	teacher_list = np.asarray(teacher_list)
+	# the first and second teacher schedules are arrays of the form 
+	# N_hours X N_classes, in which the entries are the teacher teaching a
+	# given class during a given hour
 	first_teachers = teacher_list[0:N_hours * N_classes]\
 				.reshape((N_hours, N_classes))
 	second_teachers = teacher_list[N_hours * N_classes:]\
 				.reshape((int(N_hours * (2/3)), N_classes))
 
-	# distill the first teacher schedule into a DataFrame with a hierarchical
-	# index of form [weekday, teacher]
-	first_teacher_schedule = pd.DataFrame(columns=['hour'] + ['class_{}'\
-			.format(i) for i in range(1, N_classes + 1)])
-	first_teacher_schedule['hour'] = [i for i in range(1, N_hours + 1)]
-	for i in range(0, N_classes):
-		first_teacher_schedule['class_{}'.format(i + 1)] = first_teachers[0:,i]
-	first_teacher_schedule.index = first_teacher_schedule['hour']
-	first_teacher_schedule = first_teacher_schedule.drop(columns = ['hour'])
-		
-	# distill the second teacher schedule into a DataFrame with a hierarchical
-	# index of form [weekday, teacher]
-	second_teacher_schedule = pd.DataFrame(columns=['hour'] + ['class_{}'.format(i) for i in range(1, N_classes + 1)])
-	second_teacher_schedule['hour'] = [i for i in range(1, int(N_hours * (2/3)) + 1)]
-	for i in range(0, N_classes):
-		second_teacher_schedule['class_{}'.format(i + 1)] = second_teachers[0:, i]
-	second_teacher_schedule.index = second_teacher_schedule['hour']
-	second_teacher_schedule = second_teacher_schedule.drop(columns = ['hour'])
-
-	# create the overall teacher schedule of form (N_weekdays * N_teachers) X
-	# N_hours by drawing information from the first_teacher_schedule and the
-	# second_teacher_schedule
-	schedule_df = pd.DataFrame(columns=['teacher'] + ['hour_{}'.format(i) for\
-			 i in range(1, max_hours + 1)])
-	schedule_df['teacher'] = teacher_nodes * N_weekdays
-	iterables = [range(1, N_weekdays + 1), teacher_nodes]
-	index = pd.MultiIndex.from_product(iterables, names=['weekday', 'teacher'])
-	schedule_df.index = index
-	schedule_df = schedule_df.drop(columns = ['teacher'])
+	# create the overall teacher schedule of form N_weekdays X N_teachers X
+	# N_hours by drawing information from the first_teachers and the 
+	# second_teachers
+	schedule_arr = _get_empty_schedule(teacher_nodes)
+	teaching_days = [wd - 1 for wd in range(1, N_weekdays + 1) \
+					 if wd not in weekend_days]
 
 	for c in range(1, N_classes + 1):
 		for hour in range(1, N_hours + 1):
-			for wd in range(1, N_weekdays + 1):
-				if wd not in weekend_days:
-					t1 = first_teacher_schedule.loc[hour, 'class_{}'.format(c)]
-					schedule_df.loc[wd, 't{:04d}'.format(t1)]\
-								['hour_{}'.format(hour)] = c
-					# try to find a second teacher for the same lesson. 
-					try:
-						t2 = second_teacher_schedule.loc[hour, 'class_{}'.format(c)]
-						schedule_df.loc[wd, 't{:04d}'.format(t2)]\
-								['hour_{}'.format(hour)] = c
-					except KeyError:
-						pass
+			t1 = first_teachers[hour - 1, c - 1]
+			schedule_arr[teaching_days, t1 - 1, hour - 1] = c
+			# try to find a second teacher for the same lesson. 
+			if hour <= len(second_teachers):
+				t2 = second_teachers[hour - 1, c - 1]
+				schedule_arr[teaching_days, t2 - 1, hour - 1] = c
 
 	# for the hours past the teaching hours (N_hours): set schedule entries for
 	# all teachers to NaN
-	for t in teacher_nodes:
-		for hour in range(N_hours + 1, max_hours + 1):
-			for wd in range(1, N_weekdays + 1):
-				schedule_df.loc[wd, t]['hour_{}'.format(hour)] = pd.NA
+	schedule_arr[:, :, N_hours:max_hours] = pd.NA
 
+	schedule_df = _schedule_to_frame(schedule_arr, teacher_nodes, 'teacher')
 	schedule_df = schedule_df.replace({np.nan:pd.NA})
 	# shift afternoon teaching hours by one to make space for the lunch break
 	# in the fifth hour:
@@ -1607,16 +1631,6 @@ def generate_teacher_schedule_lower_secondary_daycare(N_classes):
 	# the list is then reshaped into an N_hours X N_classes array - the schedule
 	first_teacher_list = np.asarray(first_teacher_list)
 	first_teachers = first_teacher_list.reshape((N_hours, N_classes))
-	# we convert the array to a data frame for easier indexing when we create 
-	# the overall teacher schedule below
-	first_teacher_schedule = pd.DataFrame(columns=['hour'] + \
-				['class_{}'.format(i) for i in range(1, N_classes + 1)])
-	first_teacher_schedule['hour'] = [i for i in range(1, N_hours + 1)]
-
-	for i in range(0, N_classes):
-		first_teacher_schedule['class_{}'.format(i + 1)] = first_teachers[0:,i]
-	first_teacher_schedule.index = first_teacher_schedule['hour']
-	first_teacher_schedule = first_teacher_schedule.drop(columns = ['hour'])
 		
 	# then we construct a sequential list of length N_classes * 5, intended to 
 	# add a second teacher to 5 out of 6 lessons per day. The list is shifted in
@@ -1629,41 +1643,23 @@ def generate_teacher_schedule_lower_secondary_daycare(N_classes):
 	# teaching schedule
 	second_teacher_list = np.asarray(second_teacher_list)
 	second_teachers = second_teacher_list.reshape((5, N_classes))
-	second_teacher_schedule = pd.DataFrame(columns=['hour'] + \
-				['class_{}'.format(i) for i in range(1, N_classes + 1)])
-	second_teacher_schedule['hour'] = [i for i in range(1, 5 + 1)]
-	for i in range(0, N_classes):
-		second_teacher_schedule['class_{}'.format(i+1)] = second_teachers[0:, i]
-	second_teacher_schedule.index = second_teacher_schedule['hour']
-	second_teacher_schedule = second_teacher_schedule.drop(columns = ['hour'])
-
-	# the overall schedule is a table of (N_weekdays * N_teachers) X N_hours,
+
+	# the overall schedule is an array of N_weekdays X N_teachers X N_hours,
 	# in which the entries are the class that is taught by a given teacher in a
-	# given time. We construct this table from the first teacher schedule and 
-	# the second teacher schedule
-	schedule_df = pd.DataFrame(columns=['teacher'] + ['hour_{}'.format(i) for\
-			 i in range(1, max_hours + 1)])
-	schedule_df['teacher'] = teacher_nodes * N_weekdays
-	iterables = [range(1, N_weekdays + 1), teacher_nodes]
-	index = pd.MultiIndex.from_product(iterables, names=['weekday', 'teacher'])
-	schedule_df.index = index
-	schedule_df = schedule_df.drop(columns = ['teacher'])
+	# given time. We construct this array from the first teachers and the 
+	# second teachers
+	schedule_arr = _get_empty_schedule(teacher_nodes)
+	teaching_days = [wd - 1 for wd in range(1, N_weekdays + 1) \
+					 if wd not in weekend_days]
 
 	for c in range(1, N_classes + 1):
 		for hour in range(1, N_hours + 1):
-			for wd in range(1, N_weekdays):
-				if not wd in weekend_days:
-					t1 = first_teacher_schedule.loc[hour, 'class_{}'.format(c)]
-					schedule_df.loc[wd, 't{:04d}'.format(t1)]\
-						['hour_{}'.format(hour)] = c
-					# not all hours have a second teacher
-					try:
-						t2 = second_teacher_schedule.loc[\
-										hour, 'class_{}'.format(c)]
-						schedule_df.loc[wd, 't{:04d}'.format(t2)]\
-							['hour_{}'.format(hour)] = c
-					except KeyError:
-						pass
+			t1 = first_teachers[hour - 1, c - 1]
+			schedule_arr[teaching_days, t1 - 1, hour - 1] = c
+			# not all hours have a second teacher
+			if hour <= len(second_teachers):
+				t2 = second_teachers[hour - 1, c - 1]
+				schedule_arr[teaching_days, t2 - 1, hour - 1] = c
 
 	# daycare is handled separately: in the afternoon, half of the students go 
 	# home and the other half are randomly distributed to a number of groups 
@@ -1679,13 +1675,10 @@ def generate_teacher_schedule_lower_secondary_daycare(N_classes):
 	# add the daycare supervision to the overall teacher schedule
 	for dc_group in range(0, int(N_classes / 2)):
 		for t in daycare_teacher_list[0:, dc_group]:
-			for wd in range(1, N_weekdays + 1):
-				if wd not in weekend_days:
-					for hour in daycare_hours:
-						schedule_df.loc[wd, 't{:04d}'.format(t)]\
-							['hour_{}'.format(hour)] = dc_group + 1
-
+			for hour in daycare_hours:
+				schedule_arr[teaching_days, t - 1, hour - 1] = dc_group + 1
 
+	schedule_df = _schedule_to_frame(schedule_arr, teacher_nodes, 'teacher')
 	schedule_df = schedule_df.replace({np.nan:pd.NA})
 	# shift afternoon teaching hours by one to make space for the lunch break
 	# in the fifth hour:
@@ -1751,34 +1744,17 @@ def generate_teacher_schedule_upper_secondary(N_classes):
 	teacher_array = teacher_list[0: N_hours * N_classes]\
 		.reshape((N_hours, N_classes))
 
-	# distill the first teacher schedule into a DataFrame with a hierarchical
-	# index of form [weekday, teacher]
-	first_teacher_schedule = pd.DataFrame(columns=['hour'] + \
-				['class_{}'.format(i) for i in range(1, N_classes + 1)])
-	first_teacher_schedule['hour'] = [i for i in range(1, N_hours + 1)]
-	for i in range(0, N_classes):
-		first_teacher_schedule['class_{}'.format(i + 1)] = teacher_array[0:,i]
-	first_teacher_schedule.index = first_teacher_schedule['hour']
-	first_teacher_schedule = first_teacher_schedule.drop(columns = ['hour'])
-
-	# create the overall teacher schedule of form (N_weekdays * N_teachers) X
-	# N_hours by drawing information from the first_teacher_schedule and then 
+	# create the overall teacher schedule of form N_weekdays X N_teachers X
+	# N_hours by drawing information from the teacher_array and then 
 	# adding additional teacher to about 10% of lessons at random
-	schedule_df = pd.DataFrame(columns=['teacher'] + ['hour_{}'.format(i) for\
-			 i in range(1, max_hours + 1)])
-	schedule_df['teacher'] = teacher_nodes * N_weekdays
-	iterables = [range(1, N_weekdays + 1), teacher_nodes]
-	index = pd.MultiIndex.from_product(iterables, names=['weekday', 'teacher'])
-	schedule_df.index = index
-	schedule_df = schedule_df.drop(columns = ['teacher'])
+	schedule_arr = _get_empty_schedule(teacher_nodes)
+	teaching_days = [wd - 1 for wd in range(1, N_weekdays + 1) \
+					 if wd not in weekend_days]
 
 	for c in range(1, N_classes + 1):
 		for hour in range(1, N_hours + 1):
-			for wd in range(1, N_weekdays + 1):
-				if wd not in weekend_days:
-					t1 = first_teacher_schedule.loc[hour, 'class_{}'.format(c)]
-					schedule_df.loc[wd, 't{:04d}'.format(t1)]\
-							['hour_{}'.format(hour)] = c
+			t1 = teacher_array[hour - 1, c - 1]
+			schedule_arr[teaching_days, t1 - 1, hour - 1] = c
 
 	## team-teaching
 	# Note: this has a small chance that the same teacher team-teaches twice in 
@@ -1792,11 +1768,9 @@ def generate_teacher_schedule_upper_secondary(N_classes):
 	for t in range(1, N_additional_teachers + 1):
 		for idx in team_idx[(t - 1) * N_team_hours: t * N_team_hours]:
 			hour, c = all_hours[idx]
-			for wd in range(1, N_weekdays + 1):
-				if wd not in weekend_days:
-					schedule_df.loc[wd, 't{:04d}'.format(N_teachers + t)]\
-						['hour_{}'.format(hour)] = c
+			schedule_arr[teaching_days, N_teachers + t - 1, hour - 1] = c
 
+	schedule_df = _schedule_to_frame(schedule_arr, teacher_nodes, 'teacher')
 	schedule_df = schedule_df.replace({np.nan:pd.NA})
 	# shift afternoon teaching hours by one to make space for the lunch break
 	# in the fifth hour:
@@ -1854,33 +1828,18 @@ def generate_teacher_schedule_secondary(N_classes):
 	teacher_list = np.asarray(teacher_list)
 	teacher_array = teacher_list[0: N_hours * N_classes].reshape((N_hours, N_classes))
 
-	# distill the first teacher schedule into a DataFrame with a hierarchical
-	# index of form [weekday, teacher]
-	first_teacher_schedule = pd.DataFrame(columns=['hour'] + ['class_{}'.format(i) for i in range(1, N_classes + 1)])
-	first_teacher_schedule['hour'] = [i for i in range(1, N_hours + 1)]
-	for i in range(0, N_classes):
-		first_teacher_schedule['class_{}'.format(i + 1)] = teacher_array[0:,i]
-	first_teacher_schedule.index = first_teacher_schedule['hour']
-	first_teacher_schedule = first_teacher_schedule.drop(columns = ['hour'])
-
-	# create the overall teacher schedule of form (N_weekdays * N_teachers) X
-	# N_hours by drawing information from the first_teacher_schedule 
-	schedule_df = pd.DataFrame(columns=['teacher'] + ['hour_{}'.format(i) for\
-			 i in range(1, max_hours + 1)])
-	schedule_df['teacher'] = teacher_nodes * N_weekdays
-	iterables = [range(1, N_weekdays + 1), teacher_nodes]
-	index = pd.MultiIndex.from_product(iterables, names=['weekday', 'teacher'])
-	schedule_df.index = index
-	schedule_df = schedule_df.drop(columns = ['teacher'])
+	# create the overall teacher schedule of form N_weekdays X N_teachers X
+	# N_hours by drawing information from the teacher_array 
+	schedule_arr = _get_empty_schedule(teacher_nodes)
+	teaching_days = [wd - 1 for wd in range(1, N_weekdays + 1) \
+					 if wd not in weekend_days]
 
 	for c in range(1, N_classes + 1):
 		for hour in range(1, N_hours + 1):
-			t1 = first_teacher_schedule.loc[hour, 'class_{}'.format(c)]
-			for wd in range(1, N_weekdays + 1):
-				if wd not in weekend_days:
-					schedule_df.loc[wd, 't{:04d}'.format(t1)]\
-						['hour_{}'.format(hour)] = c
+			t1 = teacher_array[hour - 1, c - 1]
+			schedule_arr[teaching_days, t1 - 1, hour - 1] = c
 
+	schedule_df = _schedule_to_frame(schedule_arr, teacher_nodes, 'teacher')
 	schedule_df = schedule_df.replace({np.nan:pd.NA})
 	# shift afternoon teaching hours by one to make space for the lunch break
 	# in the fifth hour:
@@ -2330,28 +2289,65 @@ def add_between_class_contacts(ratio, class_size, N_classes, G, copy=False):
 	_, N_weekdays, _ = get_teaching_framework()
 
 	N_students = round(ratio * class_size)
-	for c in range(1, N_classes + 1):
-	    students_in_class = [n[0] for n in G.nodes(data=True) \
-	        if n[1]['type'] == 'student' and n[1]['unit'] == 'class_{}'.format(c)]
-	    sources = np.random.choice(students_in_class, N_students, replace=False)
-	    
-	    students_in_other_classes = [n[0] for n in G.nodes(data=True) \
-	        if n[1]['type'] == 'student' and n[1]['unit'] != 'class_{}'.format(c)]
-	    targets = np.random.choice(students_in_other_classes, N_students, replace=False)
-	    
-	    for source, target in zip(sources, targets):
-	    	for wd in range(1, N_weekdays + 1):
-		        tmp = [source, target]
-		        tmp.sort()
-		        n1, n2 = tmp
-		        G.add_edge(n1, n2, link_type='student_student_friends',
-		                            weekday = wd,
-		                            key = n1 + n2 + 'd{}'.format(wd))
+	student_units = [(n, data['unit']) for n, data in G.nodes(data=True) \
+		if data['type'] == 'student']
+	students = np.asarray([n for n, _ in student_units])
+	units = np.asarray([u for _, u in student_units])
+	classes = np.asarray(list(get_class_units(N_classes).values()))
+	# membership matrix of shape N_classes X N_students
+	in_class = units[np.newaxis, :] == classes[:, np.newaxis]
+	assert N_students <= in_class.sum(axis=1).min(), \
+		'not enough students in class to create between-class contacts'
+	assert N_students <= (~in_class).sum(axis=1).min(), \
+		'not enough students in other classes to create between-class contacts'
+
+	# Sample the sources (students from a given class) and targets (students
+	# from all other classes) for all classes at once: every student gets a 
+	# random priority per class and the N_students students with the lowest 
+	# priority among the eligible students are picked. This corresponds to
+	# sampling without replacement.
+	priorities = np.random.random(in_class.shape)
+	sources = students[np.argsort(np.where(in_class, priorities, np.inf),
+		axis=1)[:, 0:N_students]]
+	targets = students[np.argsort(np.where(in_class, np.inf, priorities),
+		axis=1)[:, 0:N_students]]
+
+	# weekday labels used in the edge keys
+	weekdays = [(wd, 'd{}'.format(wd)) for wd in range(1, N_weekdays + 1)]
+
+	edges = []
+	for source, target in zip(sources.ravel().tolist(), 
+							  targets.ravel().tolist()):
+		tmp = [source, target]
+		tmp.sort()
+		n1, n2 = tmp
+		edges.extend([(n1, n2, n1 + n2 + wd_string, 
+			{'link_type':'student_student_friends', 'weekday':wd}) \
+			for wd, wd_string in weekdays])
+	G.add_edges_from(edges)
 
 	if copy:
 		return G
 
 
+# columns of the node list, see get_node_list() and write_node_list()
+NODE_LIST_COLUMNS = ['ID', 'type', 'location', 'family']
+
+def _iter_node_records(G):
+	"""
+	Yield a (ID, type, location, family) tuple for every node in the graph, in
+	the order the nodes are stored in the graph.
+	"""
+	for n, data in G.nodes(data=True):
+		node_type = data['type']
+		if node_type == 'student':
+			l = data['unit']
+		elif node_type == 'teacher':
+			l = 'faculty_room'
+		else:
+			l = 'home'
+		yield n, node_type, l, int(data['family'])
+
 def get_node_list(G):
 	"""
 	Extract information about the family (household) number, location and node
@@ -2378,25 +2374,31 @@ def get_node_list(G):
 		N_agents = N_students + N_teachers + N_family_members.
 
 	"""
-	node_list = pd.DataFrame()
-	for n in G.nodes(data=True):
-		if n[1]['type'] == 'student':
-			l = n[1]['unit']
-			f = n[1]['family']
+	node_list = pd.DataFrame(list(_iter_node_records(G)), 
+							 columns=NODE_LIST_COLUMNS)
+	node_list['family'] = node_list['family'].astype(int)
 
-		elif n[1]['type'] == 'teacher':
-			l = 'faculty_room'
-			f = n[1]['family']
-		else:
-			l = 'home'
-			f = n[1]['family']
+	return node_list
 
-		node_list = node_list.append({'ID':n[0],
-									  'type':n[1]['type'],
-									  'location':l,
-									  'family':f}, ignore_index=True)
 
-	node_list['family'] = node_list['family'].astype(int)
+def write_node_list(G, path):
+	"""
+	Write the family (household) number, location and node type of every node
+	present in the graph to a csv file. Rows are written directly while 
+	iterating over the graph, without building the DataFrame returned by
+	get_node_list() first. The file has the columns ID, type, location and 
+	family, in that order.
 
-	return node_list
+	Parameters
+	----------
+	G : networkx Graph or MultiGraph
+		Graph that holds the agents (nodes) acting in the school and their 
+		contacts (edges). See get_node_list() for the required node attributes.
+	path : str
+		Path of the csv file the node list is written to.
+	"""
+	with open(path, 'w', newline='') as f:
+		writer = csv.writer(f)
+		writer.writerow(NODE_LIST_COLUMNS)
+		writer.writerows(_iter_node_records(G))
 
@@ -1,5 +1,7 @@
 import numpy as np
 import networkx as nx
+import pandas as pd
+from functools import partial
 from math import gamma
 from scipy.optimize import root_scalar
 
@@ -8,6 +10,7 @@ from mesa.time import RandomActivation, SimultaneousActivation
 from mesa.datacollection import DataCollector
 
 from scseirx.testing_strategy import Testing
+from scseirx.agent_SEIRX import COUNTED_STATE_ATTRIBUTES
 
 ## data collection functions ##
 def get_N_diagnostic_tests(model):
@@ -19,16 +22,89 @@ def get_N_preventive_screening_tests(model):
 
 
 def get_infection_state(agent):
-    if agent.exposed == True: return 'exposed'
-    elif agent.infectious == True: return 'infectious'
-    elif agent.recovered == True: return 'recovered'
-    else: return 'susceptible'
+    return agent.infection_state
 
 def get_quarantine_state(agent):
     if agent.quarantined == True: return True
     else: return False
 
 
+# agent reporters of the data collector. Agent reporters are given as agent 
+# attribute names, which allows mesa to record the states of all agents with a
+# single attribute getter instead of calling a reporter function per agent
+AGENT_REPORTERS = {'infection_state':'infection_state',
+                   'quarantine_state':'quarantined'}
+
+
+# agent states that are counted for every agent type by the data collector
+AGENT_STATES = ['S', 'E', 'I', 'I_asymptomatic', 'I_symptomatic', 'R', 'X', 'V']
+# agent states for which the model keeps counters. The number of agents in 
+# state 'I_asymptomatic' is derived from the counts of 'I' and 'I_symptomatic'
+COUNTED_STATES = ['S', 'E', 'I', 'I_symptomatic', 'R', 'X', 'V']
+
+
+def get_state_masks(agent_states):
+    '''
+    Determines boolean masks of the agents that are in each of the states in
+    COUNTED_STATES from a structured array of agent state attributes (see
+    SEIRX.agent_states).
+    '''
+    exposed = agent_states['exposed']
+    infectious = agent_states['infectious']
+    recovered = agent_states['recovered']
+    symptomatic = agent_states['symptomatic_course']
+    return {
+        'S':~(exposed | infectious | recovered),
+        'E':exposed,
+        'I':infectious,
+        'I_symptomatic':infectious & symptomatic,
+        'R':recovered,
+        'X':agent_states['quarantined'],
+        'V':agent_states['vaccinated']}
+
+
+def count_agents(model, agent_type, state):
+    '''
+    Counts the agents of a given type that are in a given state. Possible
+    states are 'S' (susceptible), 'E' (exposed), 'I' (infectious),
+    'I_symptomatic', 'I_asymptomatic', 'R' (recovered), 'X' (quarantined) and
+    'V' (vaccinated). The counts are looked up in the model's state counters, 
+    which are updated by the agents whenever their state changes (see 
+    agent_SEIRX.counted_state), instead of iterating over all agents.
+    '''
+    if state not in AGENT_STATES:
+        raise ValueError('unknown agent state {}'.format(state))
+
+    agent_type_code = model.agent_type_codes.get(agent_type)
+    if agent_type_code is None:
+        return 0
+
+    counts = model.state_counts
+    if state == 'I_asymptomatic':
+        return counts['I'][agent_type_code] - \
+               counts['I_symptomatic'][agent_type_code]
+    return counts[state][agent_type_code]
+
+
+def count_active_infections(model):
+    '''
+    Counts the agents of all types that are currently exposed or infectious.
+    An outbreak is over once this number drops to zero. Like count_agents(),
+    this looks up the model's state counters instead of iterating over all
+    agents.
+    '''
+    counts = model.state_counts
+    return sum(counts['E']) + sum(counts['I'])
+
+
+def check_screen(model, screen_type, agent_type):
+    '''
+    Returns whether a screen of a given type (reactive, follow_up or
+    preventive) has been conducted for a given agent type in the current step.
+    '''
+    return model.screened_agents[screen_type][agent_type]
+
+
 def get_undetected_infections(model):
     return model.undetected_infections
 
@@ -41,32 +117,44 @@ def get_pending_test_infections(model):
     return model.pending_test_infections
 
 
+def get_test_detected_infections(model, test, agent_type):
+    '''
+    Returns the number of infections in a given agent type that were detected
+    by the test type used for diagnostic tests (test = 'diagnostic') or for 
+    preventive screens (test = 'preventive').
+    '''
+    if test == 'diagnostic':
+        test_type = model.Testing.diagnostic_test_type
+    else:
+        test_type = model.Testing.preventive_screening_test_type
+    return model.positive_tests[test_type][agent_type]
+
+
+# reporters of detected infections per test and agent type, kept for code that
+# imports them and for models that were pickled with references to them. The 
+# models use get_test_detected_infections() directly
 def get_diagnostic_test_detected_infections_student(model):
-    return model.positive_tests[model.Testing.diagnostic_test_type]['student']
+    return get_test_detected_infections(model, 'diagnostic', 'student')
 
 
 def get_diagnostic_test_detected_infections_teacher(model):
-    return model.positive_tests[model.Testing.diagnostic_test_type]['teacher']
+    return get_test_detected_infections(model, 'diagnostic', 'teacher')
 
 
 def get_diagnostic_test_detected_infections_family_member(model):
-    return model.positive_tests[model.Testing.diagnostic_test_type]\
-        ['family_member']
+    return get_test_detected_infections(model, 'diagnostic', 'family_member')
 
 
 def get_preventive_test_detected_infections_student(model):
-    return model.positive_tests[model.Testing.preventive_screening_test_type]\
-        ['student']
+    return get_test_detected_infections(model, 'preventive', 'student')
 
 
 def get_preventive_test_detected_infections_teacher(model):
-    return model.positive_tests[model.Testing.preventive_screening_test_type]\
-        ['teacher']
+    return get_test_detected_infections(model, 'preventive', 'teacher')
 
 
 def get_preventive_test_detected_infections_family_member(model):
-    return model.positive_tests[model.Testing.preventive_screening_test_type]\
-        ['family_member']
+    return get_test_detected_infections(model, 'preventive', 'family_member')
 
 
 # parameter sanity check functions
@@ -179,6 +267,46 @@ def weibull_two_param(shape, scale):
     return scale * np.random.weibull(shape)
 
 
+class SEIRX_DataCollector(DataCollector):
+    '''
+    Data collector that stores the population counts of agents per agent type
+    and agent state in a numpy array instead of calling a separate model 
+    reporter per count and appending its value to a list every step. The array
+    is preallocated and grows by doubling its length whenever it is full. 
+    count_reporters is a dictionary of the form {name:(agent_type, state)}.
+    The counts are reported in the data frame returned by 
+    get_model_vars_dataframe() as columns with the given names, followed by the
+    columns of the remaining model reporters.
+    '''
+    def __init__(self, count_reporters, model_reporters=None, 
+                 agent_reporters=None, initial_steps=100):
+        super().__init__(model_reporters=model_reporters, 
+                         agent_reporters=agent_reporters)
+        self.count_reporters = count_reporters
+        self._count_buffer = np.zeros((initial_steps, len(count_reporters)),
+                                      dtype=np.int64)
+        self._N_counts = 0
+
+    def collect(self, model):
+        super().collect(model)
+
+        if self._N_counts == len(self._count_buffer):
+            self._count_buffer = np.concatenate([self._count_buffer,
+                np.zeros_like(self._count_buffer)])
+        self._count_buffer[self._N_counts] = [count_agents(model, 
+            agent_type, state) for agent_type, state in \
+            self.count_reporters.values()]
+        self._N_counts += 1
+
+    def get_model_vars_dataframe(self):
+        counts = pd.DataFrame(self._count_buffer[0:self._N_counts],
+                              columns=list(self.count_reporters.keys()))
+        if len(self.model_vars) == 0:
+            return counts
+        model_vars = super().get_model_vars_dataframe()
+        return pd.concat([counts, model_vars], axis=1)
+
+
 class SEIRX(Model):
     '''
     A model with a number of different agents that reproduces
@@ -462,6 +590,14 @@ class SEIRX(Model):
 
         # extract the different agent types from the contact graph
         self.agent_types = list(agent_types.keys())
+        # integer codes of the agent types, used to index the state counters
+        self.agent_type_codes = {agent_type:i for i, agent_type in \
+            enumerate(self.agent_types)}
+        # number of agents per agent state and agent type, in the form
+        # {state:[count of type 0, count of type 1, ...]}, see 
+        # _register_state_counts()
+        self.state_counts = {state:[0] * len(self.agent_types) for state in \
+            COUNTED_STATES}
         # dictionary of available agent classes with agent types and classes
         self.agent_classes = {}
         if 'resident' in agent_types:
@@ -590,10 +726,11 @@ class SEIRX(Model):
                             print('pathological epi-param case found!')
                             print(tmp_epi_params)
 
-                # check if the agent participates in voluntary testing
+                # check if the agent participates in voluntary testing. Note: 
+                # this draws the same random number as 
+                # np.random.choice([True, False], p=[p, 1-p]) would.
                 p = self.voluntary_testing_rates[agent_type]
-                voluntary_testing = np.random.choice([True, False],
-                         p=[p, 1-p])
+                voluntary_testing = np.random.random() < p
 
                 # construct the agent object
                 a = self.agent_classes[agent_type](ID, unit, self,
@@ -605,11 +742,20 @@ class SEIRX(Model):
                     verbosity)
                 self.schedule.add(a)
 
+        # agents do not change their type during the simulation: keep lists
+        # of the agents of each type (in scheduling order) and an array of the
+        # agent type codes, such that they do not have to be filtered from
+        # the list of all agents over and over again
+        self.agents_by_type = {agent_type:[] for agent_type in self.agent_types}
+        for a in self.schedule.agents:
+            self.agents_by_type[a.type].append(a)
+        # agents by their ID (which is also their node in the contact network)
+        self.agents_by_ID = {a.ID:a for a in self.schedule.agents}
+        self._register_state_counts()
 
 		# infect the first agent in single index case mode
         if self.index_case != 'continuous':
-            infection_targets = [
-                a for a in self.schedule.agents if a.type == index_case]
+            infection_targets = self.agents_by_type[index_case]
             # pick a random agent to infect in the selected agent group
             target = self.random.randint(0, len(infection_targets) - 1)
             infection_targets[target].exposed = True
@@ -673,33 +819,62 @@ class SEIRX(Model):
 
         # data collectors to save population counts and agent states every
         # time step
+        model_reporters = {
+            'N_diagnostic_tests':get_N_diagnostic_tests,
+            'N_preventive_screening_tests':get_N_preventive_screening_tests}
+        for test in ['diagnostic', 'preventive']:
+            for agent_type in ['student', 'teacher', 'family_member']:
+                model_reporters.update(
+                    {'{}_test_detected_infections_{}'.format(test, agent_type):\
+                    partial(get_test_detected_infections, test=test, 
+                            agent_type=agent_type)})
+        model_reporters.update({
+            'undetected_infections':get_undetected_infections,
+            'predetected_infections':get_predetected_infections,
+            'pending_test_infections':get_pending_test_infections})
+
         self.datacollector = DataCollector(
-            model_reporters=
-            	{
-            	'N_diagnostic_tests':get_N_diagnostic_tests,
-                'N_preventive_screening_tests':get_N_preventive_screening_tests,
-                'diagnostic_test_detected_infections_student':\
-                        get_diagnostic_test_detected_infections_student,
-                'diagnostic_test_detected_infections_teacher':\
-                        get_diagnostic_test_detected_infections_teacher,
-                'diagnostic_test_detected_infections_family_member':\
-                        get_diagnostic_test_detected_infections_family_member,
-                'preventive_test_detected_infections_student':\
-                        get_preventive_test_detected_infections_student,
-                'preventive_test_detected_infections_teacher':\
-                        get_preventive_test_detected_infections_teacher,
-                'preventive_test_detected_infections_family_member':\
-                        get_preventive_test_detected_infections_family_member,
-                'undetected_infections':get_undetected_infections,
-                'predetected_infections':get_predetected_infections,
-                'pending_test_infections':get_pending_test_infections
-                },
-
-            agent_reporters=
-            	{
-            	'infection_state': get_infection_state,
-                'quarantine_state': get_quarantine_state
-                })
+            model_reporters=model_reporters,
+
+            agent_reporters=AGENT_REPORTERS)
+
+
+    def _register_state_counts(self):
+        '''
+        Stores the state attributes and type codes of all agents (in 
+        scheduling order) in a structured array with one field per attribute,
+        counts the agents per agent state and agent type from this array and
+        registers the agents with the state counters. From then on, the agents
+        keep the counters and their entry in the array up to date themselves 
+        whenever one of their state attributes changes.
+        '''
+        agents = self.schedule.agents
+        self.agent_states = np.zeros(len(agents), 
+            dtype=[(attr, np.bool_) for attr in COUNTED_STATE_ATTRIBUTES] + \
+                  [('type', np.int8)])
+
+        # agents in the order of their entries in agent_states
+        self.agents_by_index = agents
+        for i, a in enumerate(agents):
+            # counted states that were never set would be read as the
+            # counted_state descriptor itself (see agent_SEIRX.counted_state)
+            missing = [attr for attr in COUNTED_STATE_ATTRIBUTES if \
+                       attr not in a.__dict__]
+            assert len(missing) == 0, \
+                'agent {} has no counted states {}'.format(a.ID, missing)
+            self.agent_states[i] = tuple(a.__dict__[attr] for attr in \
+                COUNTED_STATE_ATTRIBUTES) + (a.type_code, )
+            a._index = i
+
+        # one bincount over the agent type codes per agent state yields the
+        # counts of all agent types at once
+        agent_types = self.agent_states['type']
+        for state, mask in get_state_masks(self.agent_states).items():
+            self.state_counts[state] = np.bincount(agent_types[mask], 
+                minlength=len(self.agent_types)).tolist()
+
+        for a in agents:
+            a._counted = True
 
 
     ## transmission risk modifiers
@@ -917,9 +1092,8 @@ class SEIRX(Model):
             print('initiating {} {} screen'\
                                 .format(screen_type, agent_group))
 
-        untested_agents = [a for a in self.schedule.agents if
-            (a.tested == False and a.known_positive == False
-                and a.type == agent_group)]
+        untested_agents = [a for a in self.agents_by_type[agent_group] if
+            (a.tested == False and a.known_positive == False)]
 
         if len(untested_agents) > 0:
             self.screened_agents[screen_type][agent_group] = True
@@ -965,9 +1139,14 @@ class SEIRX(Model):
         # find all agents that share edges with the agent
         # that are classified as K1 contact types in the testing
         # strategy
-        K1_contacts = [e[1] for e in self.G.edges(a.ID, data=True) if
-            e[2]['contact_type'] in self.Testing.K1_contact_types]
-        K1_contacts = [a for a in self.schedule.agents if a.ID in K1_contacts]
+        K1_contact_types = self.Testing.K1_contact_types
+        K1_contacts = {v for (u, v, contact_type) in self.G.edges(a.ID,
+            data='contact_type') if contact_type in K1_contact_types}
+        # look up the contacts' agents by their ID and quarantine them in 
+        # scheduling order
+        K1_contacts = [self.agents_by_ID[ID] for ID in K1_contacts if \
+            ID in self.agents_by_ID]
+        K1_contacts.sort(key=lambda a: a._index)
 
         for K1_contact in K1_contacts:
             if self.verbosity > 0:
@@ -978,9 +1157,13 @@ class SEIRX(Model):
 
     def test_symptomatic_agents(self):
         # find symptomatic agents that have not been tested yet and are not
-        # in quarantine and test them
-        newly_symptomatic_agents = np.asarray([a for a in self.schedule.agents
-            if (a.symptoms == True and a.tested == False and a.quarantined == False)])
+        # in quarantine and test them. Only agents that are or were infected 
+        # can show symptoms, therefore only these agents need to be checked
+        agents_by_index = self.agents_by_index
+        infected_agents = [agents_by_index[i] for i in np.flatnonzero(
+            self.agent_states['infectious'] | self.agent_states['recovered'])]
+        newly_symptomatic_agents = [a for a in infected_agents
+            if (a.symptoms == True and a.tested == False and a.quarantined == False)]
 
         for a in newly_symptomatic_agents:
             # all symptomatic agents are quarantined by default
@@ -1022,11 +1205,19 @@ class SEIRX(Model):
             print('weekday {}'.format(self.weekday))
 
         if self.testing:
-            for agent_type in self.agent_types:
-                for screen_type in ['reactive', 'follow_up', 'preventive']:
-                    self.screened_agents[screen_type][agent_type] = False
-
-            if self.verbosity > 0:
+            # bind frequently accessed attributes to local variables
+            testing = self.testing
+            Testing = self.Testing
+            weekday = self.weekday
+            verbosity = self.verbosity
+            screened_agents = self.screened_agents
+            days_since_last_agent_screen = self.days_since_last_agent_screen
+            scheduled_follow_up_screen = self.scheduled_follow_up_screen
+            for screened in screened_agents.values():
+                for agent_type in screened:
+                    screened[agent_type] = False
+
+            if verbosity > 0:
                 print('* testing and tracing *')
 
             self.test_symptomatic_agents()
@@ -1048,70 +1239,72 @@ class SEIRX(Model):
             # a preventive screen in a given agent group
 
             # (a)
-            if (self.testing == 'background' or self.testing == 'background+preventive')\
+            if (testing == 'background' or testing == 'background+preventive')\
                and self.new_positive_tests == True:
                 for agent_type in self.screening_agents:
                     self.screen_agents(
-                        agent_type, self.Testing.diagnostic_test_type, 'reactive')
-                    self.scheduled_follow_up_screen[agent_type] = True
+                        agent_type, Testing.diagnostic_test_type, 'reactive')
+                    scheduled_follow_up_screen[agent_type] = True
 
             # (b)
-            elif (self.testing == 'background' or self.testing == 'background+preventive') and \
-                self.Testing.follow_up_testing_interval != None and \
-                sum(list(self.scheduled_follow_up_screen.values())) > 0:
+            elif (testing == 'background' or testing == 'background+preventive') and \
+                Testing.follow_up_testing_interval != None and \
+                any(scheduled_follow_up_screen.values()):
                 for agent_type in self.screening_agents:
-                    if self.scheduled_follow_up_screen[agent_type] and\
-                       self.days_since_last_agent_screen[agent_type] >=\
-                       self.Testing.follow_up_testing_interval:
+                    if scheduled_follow_up_screen[agent_type] and\
+                       days_since_last_agent_screen[agent_type] >=\
+                       Testing.follow_up_testing_interval:
                         self.screen_agents(
-                            agent_type, self.Testing.diagnostic_test_type, 'follow_up')
+                            agent_type, Testing.diagnostic_test_type, 'follow_up')
                     else:
-                        if self.verbosity > 0:
+                        if verbosity > 0:
                             print('not initiating {} follow-up screen (last screen too close)'\
                                 .format(agent_type))
 
             # (c) 
-            elif (self.testing == 'preventive' or self.testing == 'background+preventive')and \
-                np.any(list(self.Testing.screening_intervals.values())):
+            elif (testing == 'preventive' or testing == 'background+preventive')and \
+                any(Testing.screening_intervals.values()):
 
                 for agent_type in self.screening_agents:
-                    interval = self.Testing.screening_intervals[agent_type]
+                    interval = Testing.screening_intervals[agent_type]
                     assert interval in [7, 3, 2, None], \
                         'testing interval {} for agent type {} not supported!'\
                         .format(interval, agent_type)
 
                     # (c.1) testing every 7 days = testing on Mondays
-                    if interval == 7 and self.weekday == 1:
+                    if interval == 7 and weekday == 1:
                         self.screen_agents(agent_type,
-                            self.Testing.preventive_screening_test_type,\
+                            Testing.preventive_screening_test_type,\
                              'preventive')
                     # (c.2) testing every 3 days = testing on Mo & Turs
-                    elif interval == 3 and self.weekday in [1, 4]:
+                    elif interval == 3 and weekday in [1, 4]:
                             self.screen_agents(agent_type,
-                            self.Testing.preventive_screening_test_type,\
+                            Testing.preventive_screening_test_type,\
                              'preventive')
                     # (c.3) testing every 2 days = testing on Mo, Wed & Fri
-                    elif interval == 2 and self.weekday in [1, 3, 5]:
+                    elif interval == 2 and weekday in [1, 3, 5]:
                             self.screen_agents(agent_type,
-                            self.Testing.preventive_screening_test_type,\
+                            Testing.preventive_screening_test_type,\
                              'preventive')
                     # No interval specified = no testing, even if testing
                     # mode == preventive
                     elif interval == None:
                         pass
                     else:
-                        if self.verbosity > 0:
+                        if verbosity > 0:
                             print('not initiating {} preventive screen (wrong weekday)'\
                                     .format(agent_type))
             else:
                 # do nothing
                 pass
 
+            reactive = screened_agents['reactive']
+            follow_up = screened_agents['follow_up']
+            preventive = screened_agents['preventive']
             for agent_type in self.agent_types:
-                if not (self.screened_agents['reactive'][agent_type] or \
-                        self.screened_agents['follow_up'][agent_type] or \
-                        self.screened_agents['preventive'][agent_type]):
-                        self.days_since_last_agent_screen[agent_type] += 1
+                if not (reactive[agent_type] or follow_up[agent_type] or \
+                        preventive[agent_type]):
+                        days_since_last_agent_screen[agent_type] += 1
 
 
         if self.verbosity > 0: print('* agent interaction *')
@@ -1,129 +1,111 @@
-import numpy as np
-import networkx as nx
+from functools import partial
+
 from mesa import Model
 from mesa.time import RandomActivation, SimultaneousActivation
-from mesa.datacollection import DataCollector
 
-from scseirx.model_SEIRX import *
+from scseirx.model_SEIRX import (SEIRX, SEIRX_DataCollector, AGENT_STATES,
+                                 count_agents, check_screen,
+                                 get_N_diagnostic_tests,
+                                 get_N_preventive_screening_tests,
+                                 get_undetected_infections,
+                                 get_predetected_infections,
+                                 get_pending_test_infections,
+                                 AGENT_REPORTERS)
 
 
 ## data collection functions ##
+# the models report population counts and screens with count_agents() and
+# check_screen() directly. The functions per agent type and state below are
+# kept for code that imports them and for models and data collectors that were
+# pickled with references to them.
+
 def count_S_resident(model):
-    S = np.asarray([1 for a in model.schedule.agents if a.type == 'resident' and\
-                    a.exposed == False and a.recovered == False \
-                    and a.infectious == False]).sum()
-    return S
-    
-    
+    return count_agents(model, 'resident', 'S')
+
+
 def count_E_resident(model):
-    E = np.asarray(
-        [a.exposed for a in model.schedule.agents if a.type == 'resident']).sum()
-    return E
+    return count_agents(model, 'resident', 'E')
 
 
 def count_I_resident(model):
-    I = np.asarray(
-        [a.infectious for a in model.schedule.agents if a.type == 'resident']).sum()
-    return I
+    return count_agents(model, 'resident', 'I')
 
 
 def count_I_symptomatic_resident(model):
-    I = np.asarray([a.infectious for a in model.schedule.agents if
-        (a.type == 'resident'and a.symptomatic_course)]).sum()
-    return I
+    return count_agents(model, 'resident', 'I_symptomatic')
+
 
 def count_V_resident(model):
-    V = np.asarray([a.vaccinated for a in model.schedule.agents if
-        (a.type == 'resident')]).sum()
-    return V
+    return count_agents(model, 'resident', 'V')
+
 
 def count_I_asymptomatic_resident(model):
-    I = np.asarray([a.infectious for a in model.schedule.agents if
-        (a.type == 'resident'and a.symptomatic_course == False)]).sum()
-    return I
+    return count_agents(model, 'resident', 'I_asymptomatic')
 
 
 def count_R_resident(model):
-    R = np.asarray(
-        [a.recovered for a in model.schedule.agents if a.type == 'resident']).sum()
-    return R
+    return count_agents(model, 'resident', 'R')
 
 
 def count_X_resident(model):
-    X = np.asarray(
-        [a.quarantined for a in model.schedule.agents if a.type == 'resident']).sum()
-    return X
+    return count_agents(model, 'resident', 'X')
 
 
 def count_S_employee(model):
-    S = np.asarray([1 for a in model.schedule.agents if a.type == 'employee' and\
-                    a.exposed == False and a.recovered == False \
-                    and a.infectious == False]).sum()
-    return S
+    return count_agents(model, 'employee', 'S')
 
 
 def count_E_employee(model):
-    E = np.asarray(
-        [a.exposed for a in model.schedule.agents if a.type == 'employee']).sum()
-    return E
+    return count_agents(model, 'employee', 'E')
 
 
 def count_I_employee(model):
-    I = np.asarray(
-        [a.infectious for a in model.schedule.agents if a.type == 'employee']).sum()
-    return I
+    return count_agents(model, 'employee', 'I')
 
 
 def count_I_symptomatic_employee(model):
-    I = np.asarray([a.infectious for a in model.schedule.agents if
-        (a.type == 'employee'and a.symptomatic_course)]).sum()
-    return I
+    return count_agents(model, 'employee', 'I_symptomatic')
+
 
 def count_V_employee(model):
-    V = np.asarray([a.vaccinated for a in model.schedule.agents if
-        (a.type == 'employee')]).sum()
-    return V
+    return count_agents(model, 'employee', 'V')
+
 
 def count_I_asymptomatic_employee(model):
-    I = np.asarray([a.infectious for a in model.schedule.agents if
-        (a.type == 'employee'and a.symptomatic_course == False)]).sum()
-    return I
+    return count_agents(model, 'employee', 'I_asymptomatic')
 
 
 def count_R_employee(model):
-    R = np.asarray(
-        [a.recovered for a in model.schedule.agents if a.type == 'employee']).sum()
-    return R
+    return count_agents(model, 'employee', 'R')
 
 
 def count_X_employee(model):
-    X = np.asarray(
-        [a.quarantined for a in model.schedule.agents if a.type == 'employee']).sum()
-    return X
+    return count_agents(model, 'employee', 'X')
 
 
 def check_reactive_resident_screen(model):
-    return model.screened_agents['reactive']['resident']
+    return check_screen(model, 'reactive', 'resident')
 
 
 def check_follow_up_resident_screen(model):
-    return model.screened_agents['follow_up']['resident']
+    return check_screen(model, 'follow_up', 'resident')
 
 
 def check_preventive_resident_screen(model):
-    return model.screened_agents['preventive']['resident']
+    return check_screen(model, 'preventive', 'resident')
 
 
 def check_reactive_employee_screen(model):
-    return model.screened_agents['reactive']['employee']
+    return check_screen(model, 'reactive', 'employee')
 
 
 def check_follow_up_employee_screen(model):
-    return model.screened_agents['follow_up']['employee']
+    return check_screen(model, 'follow_up', 'employee')
 
 
 def check_preventive_employee_screen(model):
-    return model.screened_agents['preventive']['employee']
+    return check_screen(model, 'preventive', 'employee')
+
 
 data_collection_functions = \
     {
@@ -152,8 +134,6 @@ data_collection_functions = \
     }
 
 
-
-
 class SEIRX_nursing_home(SEIRX):
 
 
@@ -240,38 +220,42 @@ class SEIRX_nursing_home(SEIRX):
 
         # data collectors to save population counts and agent states every
         # time step
-        model_reporters = {}
+        count_reporters = {}
         for agent_type in self.agent_types:
 
-            for state in ['S','E','I','I_asymptomatic','I_symptomatic','R','X', 'V']:
+            for state in AGENT_STATES:
+
+                count_reporters.update({'{}_{}'.format(state, agent_type):\
+                    (agent_type, state)})
 
-                model_reporters.update({'{}_{}'.format(state, agent_type):\
-                    data_collection_functions[agent_type][state]})
+        # agent types for which screens and test results are reported
+        reported_agent_types = ['resident', 'employee']
 
-        model_reporters.update(\
+        model_reporters = {}
+        for agent_type in reported_agent_types:
+            for screen_type in ['reactive', 'follow_up', 'preventive']:
+                model_reporters.update(
+                    {'screen_{}s_{}'.format(agent_type, screen_type):\
+                    partial(check_screen, screen_type=screen_type, 
+                            agent_type=agent_type)})
+
+        model_reporters.update(
             {
-            'screen_residents_reactive':check_reactive_resident_screen,
-            'screen_residents_follow_up':check_follow_up_resident_screen,
-            'screen_residents_preventive':check_preventive_resident_screen,
-            'screen_employees_reactive':check_reactive_employee_screen,
-            'screen_employees_follow_up':check_follow_up_employee_screen,
-            'screen_employees_preventive':check_preventive_employee_screen,
             'N_diagnostic_tests':get_N_diagnostic_tests,
-            'N_preventive_screening_tests':get_N_preventive_screening_tests,
+            'N_preventive_screening_tests':get_N_preventive_screening_tests
+            })
+
+        model_reporters.update(
+            {
             'undetected_infections':get_undetected_infections,
             'predetected_infections':get_predetected_infections,
             'pending_test_infections':get_pending_test_infections
             })
 
-        agent_reporters =\
-            {
-            'infection_state':get_infection_state,
-            'quarantine_state':get_quarantine_state
-             }
-
-        self.datacollector = DataCollector(
+        self.datacollector = SEIRX_DataCollector(
+            count_reporters = count_reporters,
             model_reporters = model_reporters,
-            agent_reporters = agent_reporters)
+            agent_reporters = AGENT_REPORTERS)
 
     def calculate_transmission_probability(self, source, target, base_risk):
         """
@@ -1,190 +1,155 @@
-import numpy as np
-import networkx as nx
+from functools import partial
+
 from mesa import Model
 from mesa.time import RandomActivation, SimultaneousActivation
-from mesa.datacollection import DataCollector
 
-from scseirx.model_SEIRX import *
+from scseirx.model_SEIRX import (SEIRX, SEIRX_DataCollector, AGENT_STATES,
+                                 count_agents, check_screen,
+                                 get_N_diagnostic_tests,
+                                 get_N_preventive_screening_tests,
+                                 get_test_detected_infections,
+                                 get_undetected_infections,
+                                 get_predetected_infections,
+                                 get_pending_test_infections,
+                                 AGENT_REPORTERS)
 
 
 ## data collection functions ##
+# the models report population counts and screens with count_agents() and
+# check_screen() directly. The functions per agent type and state below are
+# kept for code that imports them and for models and data collectors that were
+# pickled with references to them.
 
 def count_S_student(model):
-    S = np.asarray([1 for a in model.schedule.agents if a.type == 'student' and\
-                    a.exposed == False and a.recovered == False \
-                    and a.infectious == False]).sum()
-    return S
+    return count_agents(model, 'student', 'S')
 
 
 def count_E_student(model):
-    E = np.asarray(
-        [a.exposed for a in model.schedule.agents if a.type == 'student']).sum()
-    return E
+    return count_agents(model, 'student', 'E')
 
 
 def count_I_student(model):
-    I = np.asarray(
-        [a.infectious for a in model.schedule.agents if a.type == 'student']).sum()
-    return I
+    return count_agents(model, 'student', 'I')
 
 
 def count_I_symptomatic_student(model):
-    I = np.asarray([a.infectious for a in model.schedule.agents if
-        (a.type == 'student'and a.symptomatic_course)]).sum()
-    return I
+    return count_agents(model, 'student', 'I_symptomatic')
+
 
 def count_V_student(model):
-    V = np.asarray([a.vaccinated for a in model.schedule.agents if
-        (a.type == 'student')]).sum()
-    return V
+    return count_agents(model, 'student', 'V')
+
 
 def count_I_asymptomatic_student(model):
-    I = np.asarray([a.infectious for a in model.schedule.agents if
-        (a.type == 'student'and a.symptomatic_course == False)]).sum()
-    return I
+    return count_agents(model, 'student', 'I_asymptomatic')
 
 
 def count_R_student(model):
-    R = np.asarray(
-        [a.recovered for a in model.schedule.agents if a.type == 'student']).sum()
-    return R
+    return count_agents(model, 'student', 'R')
 
 
 def count_X_student(model):
-    X = np.asarray(
-        [a.quarantined for a in model.schedule.agents if a.type == 'student']).sum()
-    return X
+    return count_agents(model, 'student', 'X')
 
 
 def count_S_teacher(model):
-    S = np.asarray([1 for a in model.schedule.agents if a.type == 'feacher' and\
-                    a.exposed == False and a.recovered == False \
-                    and a.infectious == False]).sum()
-    return S
+    return count_agents(model, 'teacher', 'S')
 
 
 def count_E_teacher(model):
-    E = np.asarray(
-        [a.exposed for a in model.schedule.agents if a.type == 'teacher']).sum()
-    return E
+    return count_agents(model, 'teacher', 'E')
 
 
 def count_I_teacher(model):
-    I = np.asarray(
-        [a.infectious for a in model.schedule.agents if a.type == 'teacher']).sum()
-    return I
+    return count_agents(model, 'teacher', 'I')
 
 
 def count_I_symptomatic_teacher(model):
-    I = np.asarray([a.infectious for a in model.schedule.agents if
-        (a.type == 'teacher'and a.symptomatic_course)]).sum()
-    return I
+    return count_agents(model, 'teacher', 'I_symptomatic')
+
 
 def count_V_teacher(model):
-    V = np.asarray([a.vaccinated for a in model.schedule.agents if
-        (a.type == 'teacher')]).sum()
-    return V
+    return count_agents(model, 'teacher', 'V')
+
 
 def count_I_asymptomatic_teacher(model):
-    I = np.asarray([a.infectious for a in model.schedule.agents if
-        (a.type == 'teacher'and a.symptomatic_course == False)]).sum()
-    return I
+    return count_agents(model, 'teacher', 'I_asymptomatic')
 
 
 def count_R_teacher(model):
-    R = np.asarray(
-        [a.recovered for a in model.schedule.agents if a.type == 'teacher']).sum()
-    return R
+    return count_agents(model, 'teacher', 'R')
 
 
 def count_X_teacher(model):
-    X = np.asarray(
-        [a.quarantined for a in model.schedule.agents if a.type == 'teacher']).sum()
-    return X
+    return count_agents(model, 'teacher', 'X')
 
 
 def count_S_family_member(model):
-    S = np.asarray([1 for a in model.schedule.agents if a.type == 'family_member' and\
-                    a.exposed == False and a.recovered == False \
-                    and a.infectious == False]).sum()
-    return S
+    return count_agents(model, 'family_member', 'S')
 
 
 def count_E_family_member(model):
-    E = np.asarray(
-        [a.exposed for a in model.schedule.agents if a.type == 'family_member']).sum()
-    return E
+    return count_agents(model, 'family_member', 'E')
 
 
 def count_I_family_member(model):
-    I = np.asarray(
-        [a.infectious for a in model.schedule.agents if a.type == 'family_member']).sum()
-    return I
+    return count_agents(model, 'family_member', 'I')
 
 
 def count_I_symptomatic_family_member(model):
-    I = np.asarray([a.infectious for a in model.schedule.agents if
-        (a.type == 'family_member'and a.symptomatic_course)]).sum()
-    return I
+    return count_agents(model, 'family_member', 'I_symptomatic')
+
 
 def count_V_family_member(model):
-    V = np.asarray([a.vaccinated for a in model.schedule.agents if
-        (a.type == 'family_member')]).sum()
-    return V
+    return count_agents(model, 'family_member', 'V')
+
 
 def count_I_asymptomatic_family_member(model):
-    I = np.asarray([a.infectious for a in model.schedule.agents if
-        (a.type == 'family_member'and a.symptomatic_course == False)]).sum()
-    return I
+    return count_agents(model, 'family_member', 'I_asymptomatic')
 
 
 def count_R_family_member(model):
-    R = np.asarray(
-        [a.recovered for a in model.schedule.agents if a.type == 'family_member']).sum()
-    return R
+    return count_agents(model, 'family_member', 'R')
 
 
 def count_X_family_member(model):
-    X = np.asarray(
-        [a.quarantined for a in model.schedule.agents if a.type == 'family_member']).sum()
-    return X
+    return count_agents(model, 'family_member', 'X')
 
 
 def check_reactive_student_screen(model):
-    return model.screened_agents['reactive']['student']
+    return check_screen(model, 'reactive', 'student')
 
 
 def check_follow_up_student_screen(model):
-    return model.screened_agents['follow_up']['student']
+    return check_screen(model, 'follow_up', 'student')
 
 
 def check_preventive_student_screen(model):
-    return model.screened_agents['preventive']['student']
+    return check_screen(model, 'preventive', 'student')
 
 
 def check_reactive_teacher_screen(model):
-    return model.screened_agents['reactive']['teacher']
+    return check_screen(model, 'reactive', 'teacher')
 
 
 def check_follow_up_teacher_screen(model):
-    return model.screened_agents['follow_up']['teacher']
+    return check_screen(model, 'follow_up', 'teacher')
 
 
 def check_preventive_teacher_screen(model):
-    return model.screened_agents['preventive']['teacher']
+    return check_screen(model, 'preventive', 'teacher')
 
 
 def check_reactive_family_member_screen(model):
-    return model.screened_agents['reactive']['family_member']
+    return check_screen(model, 'reactive', 'family_member')
 
 
 def check_follow_up_family_member_screen(model):
-    return model.screened_agents['follow_up']['family_member']
+    return check_screen(model, 'follow_up', 'family_member')
 
 
 def check_preventive_family_member_screen(model):
-    return model.screened_agents['preventive']['family_member']
-
+    return check_screen(model, 'preventive', 'family_member')
 
 
 data_collection_functions = \
@@ -225,7 +190,6 @@ data_collection_functions = \
     }
 
 
-
 class SEIRX_school(SEIRX):
     '''
     Model specific parameters:
@@ -329,53 +293,49 @@ class SEIRX_school(SEIRX):
 
         # data collectors to save population counts and agent states every
         # time step
-        model_reporters = {}
+        count_reporters = {}
         for agent_type in self.agent_types:
 
-            for state in ['S','E','I','I_asymptomatic','I_symptomatic','R','X', 'V']:
+            for state in AGENT_STATES:
+
+                count_reporters.update({'{}_{}'.format(state, agent_type):\
+                    (agent_type, state)})
 
-                model_reporters.update({'{}_{}'.format(state, agent_type):\
-                    data_collection_functions[agent_type][state]})
+        # agent types for which screens and test results are reported
+        reported_agent_types = ['student', 'teacher', 'family_member']
 
-        model_reporters.update(\
+        model_reporters = {}
+        for agent_type in reported_agent_types:
+            for screen_type in ['reactive', 'follow_up', 'preventive']:
+                model_reporters.update(
+                    {'screen_{}s_{}'.format(agent_type, screen_type):\
+                    partial(check_screen, screen_type=screen_type, 
+                            agent_type=agent_type)})
+
+        model_reporters.update(
             {
-            'screen_students_reactive':check_reactive_student_screen,
-            'screen_students_follow_up':check_follow_up_student_screen,
-            'screen_students_preventive':check_preventive_student_screen,
-            'screen_teachers_reactive':check_reactive_teacher_screen,
-            'screen_teachers_follow_up':check_follow_up_teacher_screen,
-            'screen_teachers_preventive':check_preventive_teacher_screen,
-            'screen_family_members_reactive':check_reactive_family_member_screen,
-            'screen_family_members_follow_up':check_follow_up_family_member_screen,
-            'screen_family_members_preventive':check_preventive_family_member_screen,
             'N_diagnostic_tests':get_N_diagnostic_tests,
-            'N_preventive_screening_tests':get_N_preventive_screening_tests,
-            'diagnostic_test_detected_infections_student':\
-                    get_diagnostic_test_detected_infections_student,
-            'diagnostic_test_detected_infections_teacher':\
-                    get_diagnostic_test_detected_infections_teacher,
-            'diagnostic_test_detected_infections_family_member':\
-                    get_diagnostic_test_detected_infections_family_member,
-            'preventive_test_detected_infections_student':\
-                    get_preventive_test_detected_infections_student,
-            'preventive_test_detected_infections_teacher':\
-                    get_preventive_test_detected_infections_teacher,
-            'preventive_test_detected_infections_family_member':\
-                    get_preventive_test_detected_infections_family_member,
+            'N_preventive_screening_tests':get_N_preventive_screening_tests
+            })
+
+        for test in ['diagnostic', 'preventive']:
+            for agent_type in reported_agent_types:
+                model_reporters.update(
+                    {'{}_test_detected_infections_{}'.format(test, agent_type):\
+                    partial(get_test_detected_infections, test=test, 
+                            agent_type=agent_type)})
+
+        model_reporters.update(
+            {
             'undetected_infections':get_undetected_infections,
             'predetected_infections':get_predetected_infections,
             'pending_test_infections':get_pending_test_infections
             })
 
-        agent_reporters =\
-            {
-            'infection_state':get_infection_state,
-            'quarantine_state':get_quarantine_state
-             }
-
-        self.datacollector = DataCollector(
+        self.datacollector = SEIRX_DataCollector(
+            count_reporters = count_reporters,
             model_reporters = model_reporters,
-            agent_reporters = agent_reporters)
+            agent_reporters = AGENT_REPORTERS)
 
     def calculate_transmission_probability(self, source, target, base_risk):
         """
@@ -12,8 +12,8 @@ colors = {'susceptible':'g',
 
 def get_pos(G, model):
 	units = list(set([model.G.nodes[ID]['unit'] for ID in model.G.nodes]))
-	num_residents = len([a for a in model.schedule.agents if \
-		(a.type == 'resident' and a.unit == 'Q1')])
+	num_residents = len([a for a in model.agents_by_type['resident'] if \
+		a.unit == 'Q1'])
 
 	fixed = ['r{}'.format(i * num_residents + 1) for i in range(len(units))]
 
@@ -35,17 +35,26 @@ def get_pos(G, model):
 
 	return pos
 
-def draw_states(model, step, pos, pat_ax, emp_ax, leg_ax):
+def draw_states(model, step, pos, pat_ax, emp_ax, leg_ax, agent_states=None):
+	'''
+	Draws the states of residents and employees in a given step. The agent 
+	states are taken from the model's data collector. Building the DataFrame
+	of agent states is expensive, therefore callers that draw many steps of the
+	same simulation can build it once with 
+	model.datacollector.get_agent_vars_dataframe() and pass it as agent_states.
+	'''
+	if agent_states is None:
+		agent_states = model.datacollector.get_agent_vars_dataframe()
+
 	units = list(set([model.G.nodes[ID]['unit'] for ID in model.G.nodes]))
 	units.sort()
 
 	G = model.G
 
 	## draw residents
-	residents = [a.unique_id for a in model.schedule.agents if a.type == 'resident']
+	residents = [a.unique_id for a in model.agents_by_type['resident']]
 
-	resident_states = model.datacollector.get_agent_vars_dataframe()
-	resident_states = resident_states.iloc[resident_states.index.isin(residents, level=1)] 
+	resident_states = agent_states.iloc[agent_states.index.isin(residents, level=1)] 
 
 	resident_states['color'] = resident_states['infection_state'].replace(colors)
 	color_list = resident_states.loc[step].sort_index()['color']
@@ -53,12 +62,12 @@ def draw_states(model, step, pos, pat_ax, emp_ax, leg_ax):
 	quarantine_states = resident_states.loc[step].sort_index()['quarantine_state']
 
 
-	x_max = np.asarray([a[0] for a in pos.values()]).max()
-	x_min = np.asarray([a[0] for a in pos.values()]).min()
+	x_max = max(a[0] for a in pos.values())
+	x_min = min(a[0] for a in pos.values())
 	x_extent = x_max + np.abs(x_min)
 
-	y_min = np.asarray([a[1] for a in pos.values()]).min()
-	y_max = np.asarray([a[1] for a in pos.values()]).max()
+	y_min = min(a[1] for a in pos.values())
+	y_max = max(a[1] for a in pos.values())
 	y_step = (y_max + np.abs(y_min)) / 10
 
 	pat_ax.set_ylim(y_min - y_step/2, y_max + y_step) 
@@ -87,9 +96,8 @@ def draw_states(model, step, pos, pat_ax, emp_ax, leg_ax):
 
 
 	## draw employees
-	employees = [a.unique_id for a in model.schedule.agents if a.type == 'employee']
-	employee_states = model.datacollector.get_agent_vars_dataframe()
-	employee_states = employee_states.iloc[employee_states.index.isin(employees, level=1)] 
+	employees = [a.unique_id for a in model.agents_by_type['employee']]
+	employee_states = agent_states.iloc[agent_states.index.isin(employees, level=1)] 
 
 	employee_states['color'] = employee_states['infection_state'].replace(colors)
 	color_list = employee_states.loc[step].sort_index()['color']
@@ -105,8 +113,8 @@ def draw_states(model, step, pos, pat_ax, emp_ax, leg_ax):
 	emp_ax.text(0 - 0.25,  N_employee - 0.45, 'employees', fontsize=14)
 
 	for j, unit in enumerate(units):
-	    employees = [a.unique_id for a in model.schedule.agents if \
-	        (a.type == 'employee' and a.unit == unit)]
+	    employees = [a.unique_id for a in model.agents_by_type['employee'] \
+	        if a.unit == unit]
 
 	    #emp_ax.text(j - 0.065, -0.8, unit, fontsize=14)
 
@@ -0,0 +1,88 @@
+import bz2
+import pickle
+import random
+from os.path import join, dirname
+
+import numpy as np
+
+from scseirx.model_nursing_home import SEIRX_nursing_home
+from scseirx import analysis_functions as af
+
+DATA_PATH = join(dirname(__file__), '..', 'src', 'scseirx', 'data')
+
+agent_types = {
+        'employee':{
+            'screening_interval': None,
+            'index_probability': 0,
+            'mask':False},
+        'resident':{
+            'screening_interval': None,
+            'index_probability': 0,
+            'mask':False}
+}
+
+
+def get_model(run):
+    G = pickle.load(bz2.open(join(DATA_PATH, 'nursing_home',
+        'interactions_single_quarter.bz2')))
+    model = SEIRX_nursing_home(G,
+          base_transmission_risk = 0.07,
+          testing = 'preventive',
+          quarantine_duration = 10,
+          infection_risk_contact_type_weights = \
+                {'very_far':0, 'far':0.75, 'intermediate':0.85, 'close':1},
+          K1_contact_types = ['close'],
+          diagnostic_test_type = 'two_day_PCR',
+          preventive_screening_test_type = 'same_day_antigen',
+          index_case = 'employee',
+          agent_types = agent_types,
+          mask_filter_efficiency = {'exhale':0.5, 'inhale':0.7},
+          transmission_risk_ventilation_modifier = 1,
+          seed = run)
+    return model
+
+
+def run_model(run):
+    '''
+    Runs a single seeded nursing home simulation. Module level, such that it
+    can be pickled and distributed to the worker processes by run_ensemble().
+    '''
+    model = get_model(run)
+    for i in range(30):
+        model.step()
+
+    return {'run':run,
+            'infected_residents':af.count_infected(model, 'resident'),
+            'infected_employees':af.count_infected(model, 'employee'),
+            'N_diagnostic_tests':model.number_of_diagnostic_tests,
+            # draws from the global random number generators after the run
+            'numpy_draw':np.random.random(),
+            'random_draw':random.random()}
+
+
+def test_run_ensemble():
+    N_runs = 4
+    serial = af.run_ensemble(run_model, N_runs, N_workers=1)
+    parallel = af.run_ensemble(run_model, N_runs, N_workers=2)
+
+    assert len(serial) == N_runs
+    assert list(serial['run']) == list(range(N_runs))
+    # results do not depend on the number of workers
+    assert serial.equals(parallel)
+    # every run is seeded differently
+    assert serial['numpy_draw'].nunique() == N_runs
+    assert serial['random_draw'].nunique() == N_runs
+
+
+def test_count_infected():
+    model = get_model(5)
+    for i in range(30):
+        model.step()
+    counts = {agent_type:af.count_infected(model, agent_type) for agent_type \
+              in ['resident', 'employee']}
+    assert counts['resident'] > 0
+
+    # models pickled before the models kept state counters do not have them
+    del model.state_counts
+    for agent_type in ['resident', 'employee']:
+        assert af.count_infected(model, agent_type) == counts[agent_type]
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+from scseirx import construct_school_network as csn
+
+# probabilities of household sizes and compositions
+p_children = {1:0.4815, 2:0.3812, 3:0.1069, 4:0.0304}
+p_parents = {1:{1:0.1805, 2:0.8195}, 2:{1:0.0807, 2:0.9193},
+             3:{1:0.0714, 2:0.9286}, 4:{1:0.0605, 2:0.9395}}
+teacher_p_adults = {1:0.4727, 2:0.5273}
+teacher_p_children = {1:{0:0.8437, 1:0.0893, 2:0.0670},
+                      2:{0:0.4897, 1:0.2543, 2:0.2560}}
+
+
+def test_write_node_list(tmp_path):
+    np.random.seed(42)
+    G, teacher_schedule, student_schedule = csn.compose_school_graph(
+        'primary_dc', 4, 10, 2, p_children, p_parents, teacher_p_adults,
+        teacher_p_children, 0.1, 0.05)
+
+    path = tmp_path / 'node_list.csv'
+    csn.write_node_list(G, path)
+    written = pd.read_csv(path)
+
+    # the node list as it would be written via get_node_list()
+    reference_path = tmp_path / 'reference_node_list.csv'
+    csn.get_node_list(G).to_csv(reference_path, index=False)
+    reference = pd.read_csv(reference_path)
+
+    assert len(written) == G.number_of_nodes()
+    assert set(written['type']) == {'student', 'teacher', 'family_member'}
+    pd.testing.assert_frame_equal(written, reference)
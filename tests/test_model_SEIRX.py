@@ -0,0 +1,248 @@
+import bz2
+import pickle
+from functools import partial
+from os.path import join, dirname
+
+import pandas as pd
+import pytest
+from mesa.datacollection import DataCollector
+
+from scseirx.model_school import SEIRX_school
+from scseirx.model_nursing_home import SEIRX_nursing_home
+from scseirx.model_SEIRX import (AGENT_STATES, COUNTED_STATES, count_agents,
+    count_active_infections)
+
+DATA_PATH = join(dirname(__file__), '..', 'src', 'scseirx', 'data')
+
+nursing_home_agent_types = {
+        'employee':{
+            'screening_interval': None,
+            'index_probability': 0,
+            'mask':False},
+        'resident':{
+            'screening_interval': None,
+            'index_probability': 0,
+            'mask':False}
+}
+
+
+school_agent_types = {
+        'student':{
+            'screening_interval': None,
+            'index_probability': 0,
+            'mask':False},
+        'teacher':{
+            'screening_interval': 7,
+            'index_probability': 0,
+            'mask':True},
+        'family_member':{
+            'screening_interval': None,
+            'index_probability': 0,
+            'mask':False}
+}
+
+
+def get_school_model(seed):
+    G = pickle.load(bz2.open(join(DATA_PATH, 'school',
+        'test_school_primary.bz2')))
+    model = SEIRX_school(G,
+          base_transmission_risk = 0.2,
+          testing = 'preventive',
+          quarantine_duration = 10,
+          infection_risk_contact_type_weights = \
+                {'very_far':0, 'far':0.75, 'intermediate':0.85, 'close':1},
+          K1_contact_types = ['close'],
+          diagnostic_test_type = 'two_day_PCR',
+          preventive_screening_test_type = 'same_day_antigen',
+          index_case = 'student',
+          agent_types = school_agent_types,
+          mask_filter_efficiency = {'exhale':0.5, 'inhale':0.7},
+          transmission_risk_ventilation_modifier = 1,
+          seed = seed)
+    return model
+
+
+def get_nursing_home_model(seed):
+    G = pickle.load(bz2.open(join(DATA_PATH, 'nursing_home',
+        'interactions_single_quarter.bz2')))
+    model = SEIRX_nursing_home(G,
+          base_transmission_risk = 0.07,
+          testing = 'preventive',
+          quarantine_duration = 10,
+          infection_risk_contact_type_weights = \
+                {'very_far':0, 'far':0.75, 'intermediate':0.85, 'close':1},
+          K1_contact_types = ['close'],
+          diagnostic_test_type = 'two_day_PCR',
+          preventive_screening_test_type = 'same_day_antigen',
+          index_case = 'employee',
+          agent_types = nursing_home_agent_types,
+          mask_filter_efficiency = {'exhale':0.5, 'inhale':0.7},
+          transmission_risk_ventilation_modifier = 1,
+          seed = seed)
+    return model
+
+
+def brute_force_count(model, agent_type, state):
+    '''
+    Counts the agents of a given type in a given state by iterating over all
+    agents, as the models did before they kept state counters.
+    '''
+    agents = [a for a in model.schedule.agents if a.type == agent_type]
+    if state == 'S':
+        return len([a for a in agents if not \
+            (a.exposed or a.infectious or a.recovered)])
+    if state == 'E':
+        return len([a for a in agents if a.exposed])
+    if state == 'I':
+        return len([a for a in agents if a.infectious])
+    if state == 'I_symptomatic':
+        return len([a for a in agents if a.infectious and \
+            a.symptomatic_course])
+    if state == 'I_asymptomatic':
+        return len([a for a in agents if a.infectious and \
+            not a.symptomatic_course])
+    if state == 'R':
+        return len([a for a in agents if a.recovered])
+    if state == 'X':
+        return len([a for a in agents if a.quarantined])
+    if state == 'V':
+        return len([a for a in agents if a.vaccinated])
+
+
+def check_agent_counts(model):
+    for agent_type in model.agent_types:
+        for state in AGENT_STATES:
+            assert count_agents(model, agent_type, state) == \
+                brute_force_count(model, agent_type, state), \
+                'step {}: {} {}'.format(model.Nstep, agent_type, state)
+
+
+def check_state_counts(model):
+    for agent_type, code in model.agent_type_codes.items():
+        for state in COUNTED_STATES:
+            assert model.state_counts[state][code] == \
+                brute_force_count(model, agent_type, state), \
+                'step {}: {} {}'.format(model.Nstep, agent_type, state)
+
+
+def test_count_active_infections():
+    model = get_nursing_home_model(seed=5)
+    for i in range(100):
+        check_state_counts(model)
+        active_infections = len([a for a in model.schedule.agents if \
+            (a.exposed == True or a.infectious == True)])
+        assert count_active_infections(model) == active_infections
+        if active_infections == 0:
+            break
+        model.step()
+
+    # the outbreak spread beyond the index case and is over
+    assert sum(model.state_counts['R']) > 1
+    assert count_active_infections(model) == 0
+
+
+@pytest.mark.parametrize('get_model', [get_school_model, get_nursing_home_model])
+def test_count_agents(get_model):
+    model = get_model(seed=5)
+    for i in range(30):
+        check_agent_counts(model)
+        model.step()
+    check_agent_counts(model)
+    # the outbreak spread beyond the index case
+    assert sum(model.state_counts['E']) + sum(model.state_counts['I']) + \
+           sum(model.state_counts['R']) > 1
+
+    # the state counters are pickled with the model and the agents of the
+    # unpickled model keep updating the counters of the unpickled model
+    model = pickle.loads(pickle.dumps(model))
+    check_agent_counts(model)
+    for i in range(30):
+        model.step()
+        check_agent_counts(model)
+
+
+def test_count_agents_unknown_state():
+    model = get_nursing_home_model(seed=3)
+    with pytest.raises(ValueError):
+        count_agents(model, 'resident', 'Q')
+
+
+def test_datacollector():
+    model = get_nursing_home_model(seed=5)
+
+    # mesa's data collector with a model reporter per count as reference
+    model_reporters = {name:partial(count_agents, agent_type=agent_type,
+        state=state) for name, (agent_type, state) in \
+        model.datacollector.count_reporters.items()}
+    model_reporters.update(model.datacollector.model_reporters)
+    reference = DataCollector(model_reporters=model_reporters)
+
+    collect = model.datacollector.collect
+    def collect_both(model):
+        collect(model)
+        reference.collect(model)
+    model.datacollector.collect = collect_both
+
+    # more steps than the initial capacity of the count buffer (100 steps)
+    N_steps = 250
+    for i in range(N_steps):
+        model.step()
+
+    data = model.datacollector.get_model_vars_dataframe()
+    assert len(data) == N_steps
+    pd.testing.assert_frame_equal(data, reference.get_model_vars_dataframe())
+
+
+def test_reporter_functions():
+    # module level reporter functions of the models delegate to count_agents()
+    # and check_screen()
+    from scseirx import model_nursing_home
+    model = get_nursing_home_model(seed=5)
+    for i in range(30):
+        model.step()
+    for agent_type, functions in \
+        model_nursing_home.data_collection_functions.items():
+        for state, function in functions.items():
+            assert function(model) == count_agents(model, agent_type, state)
+    assert model_nursing_home.check_preventive_resident_screen(model) == \
+        model.screened_agents['preventive']['resident']
+
+
+def test_test_detected_infections_reporters():
+    from scseirx import model_SEIRX
+    model = get_school_model(seed=5)
+    for i in range(30):
+        model.step()
+    for test in ['diagnostic', 'preventive']:
+        for agent_type in ['student', 'teacher', 'family_member']:
+            function = getattr(model_SEIRX, 
+                'get_{}_test_detected_infections_{}'.format(test, agent_type))
+            assert function(model) == model_SEIRX.\
+                get_test_detected_infections(model, test, agent_type)
+
+
+def test_unpickle_agent_without_slots():
+    from scseirx.agent_SEIRX import agent_SEIRX
+    model = get_nursing_home_model(seed=5)
+    for i in range(10):
+        model.step()
+    agent = [a for a in model.schedule.agents if a.exposed or a.infectious][0]
+
+    # agents pickled before the counters and flags became slots store them in
+    # their instance dictionary
+    state = dict(agent.__dict__)
+    state.update({name:getattr(agent, name) for name in agent_SEIRX.__slots__})
+    restored = object.__new__(type(agent))
+    restored.__setstate__(state)
+
+    for name in agent_SEIRX.__slots__:
+        assert getattr(restored, name) == getattr(agent, name)
+        assert name not in restored.__dict__
+    assert restored.days_since_exposure > 0
+
+
+def test_register_state_counts_missing_state():
+    model = get_nursing_home_model(seed=5)
+    del model.schedule.agents[0].__dict__['quarantined']
+    with pytest.raises(AssertionError):
+        model._register_state_counts()